@@ -1,24 +1,50 @@
-import pandas as pd
+import boto3
+import functools
+import polars as pl
+import shutil
+import tempfile
 import zipfile
 import requests
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
-from datetime import datetime, timedelta
-import calendar
+from datetime import datetime
 import os
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+RAW_BUCKET = "capital-bikeshare-public"
+
+
+@functools.lru_cache(maxsize=1)
+def _s3():
+    # Shared by pull_missing_files' worker threads; own session because the
+    # default one is not thread-safe
+    return boto3.session.Session().client(
+        "s3",
+        config=Config(
+            max_pool_connections=64,
+            retries={"max_attempts": 10, "mode": "adaptive"},
+        ),
+    )
+
 
 def pull_and_write_from_cabi(year_str):
     url = f"https://s3.amazonaws.com/capitalbikeshare-data/{year_str}-capitalbikeshare-tripdata.zip"
-    # GET request to the URL to download the zip file
-    response = requests.get(url)
+    # Stream the zip into a spooled temp file (spills to disk past 64 MB)
+    # instead of holding the whole response body in memory
+    zip_data = tempfile.SpooledTemporaryFile(max_size=64 * 1024 * 1024)
+    with requests.get(url, stream=True) as response:
+        ok = response.status_code == 200
+        if ok:
+            shutil.copyfileobj(response.raw, zip_data)
 
     # Check if the request was successful (status code 200)
-    if response.status_code == 200:
-        zip_data = BytesIO(response.content)
+    if ok:
+        zip_data.seek(0)
 
         # Extract zip file contents
         # Note: Pre-2018 ZIPs may contain multiple quarterly CSV files
@@ -29,53 +55,80 @@ def pull_and_write_from_cabi(year_str):
             # Read and concatenate all CSV files
             dfs = []
             for csv_file in csv_files:
-                df_part = pd.read_csv(
-                    zip_ref.open(csv_file),
-                    dtype={"start_station_id": "str", "end_station_id": "str"},
-                    low_memory=False,
+                data = zip_ref.read(csv_file)
+
+                # Read station IDs as strings (some files mix ints and text);
+                # they are parsed to integers below. Other column types are
+                # inferred from the whole file, as pandas' low_memory=False
+                # did, so a late row of a different type cannot fail the read
+                header = pl.read_csv(data, n_rows=0).columns
+                id_cols = [
+                    c
+                    for c in (
+                        "start_station_id",
+                        "end_station_id",
+                        "Start station number",
+                        "End station number",
+                    )
+                    if c in header
+                ]
+                dfs.append(
+                    pl.read_csv(
+                        data,
+                        dtypes={c: pl.Utf8 for c in id_cols},
+                        infer_schema_length=None,
+                    )
                 )
-                dfs.append(df_part)
 
-            # Concatenate all parts
-            df = pd.concat(dfs, ignore_index=True)
+            # Concatenate all parts (columns aligned by name)
+            df = pl.concat(dfs, how="diagonal_relaxed")
 
             # Handle both pre-2018 and post-2018 column names
             start_col = "start_station_id" if "start_station_id" in df.columns else "Start station number"
             end_col = "end_station_id" if "end_station_id" in df.columns else "End station number"
 
-            if start_col in df.columns:
-                df[start_col] = pd.to_numeric(df[start_col], errors="coerce")
-            if end_col in df.columns:
-                df[end_col] = pd.to_numeric(df[end_col], errors="coerce")
+            # Parse IDs to integers (unparseable -> null) and drop those rows.
+            # Going through Float64 keeps IDs written as "31000.0", which a
+            # direct Int64 cast would null out
+            id_cols = [col for col in [start_col, end_col] if col in df.columns]
+            if id_cols:
+                df = df.with_columns(
+                    [
+                        pl.col(c)
+                        .cast(pl.Float64, strict=False)
+                        .cast(pl.Int64, strict=False)
+                        for c in id_cols
+                    ]
+                ).drop_nulls(id_cols)
 
-            # Only drop NAs if these columns exist
-            dropna_cols = [col for col in [start_col, end_col] if col in df.columns]
-            if dropna_cols:
-                df = df.dropna(subset=dropna_cols)
-
-            df.to_parquet(
-                f"s3://capital-bikeshare-public/{year_str}.parquet", index=False
+            buf = BytesIO()
+            df.write_parquet(buf, compression="zstd")
+            buf.seek(0)
+            _s3().upload_fileobj(
+                buf,
+                RAW_BUCKET,
+                f"{year_str}.parquet",
+                Config=TransferConfig(max_concurrency=8),
             )
             print(
                 f"{year_str} written to s3"
-            )  # Display the first few rows of the DataFrame
+            )
     else:
         print("Failed to download the file.")
 
 
 def pull_missing_files(keys: list):
     last_date = datetime.strptime(keys[-1].strip(".parquet"), "%Y%m")
-    current_year = datetime.now().year
-    current_month = datetime.now().month
-
-    # Generate missing keys
-    missing_keys = []
-    while last_date.year < current_year or (
-        last_date.year == current_year and last_date.month < current_month
-    ):
-        # Advance to the next month
-        print(f'Previously saved up through {last_date.strftime("%Y%m")} on s3')
-        last_date = last_date + timedelta(
-            days=calendar.monthrange(last_date.year, last_date.month)[1]
-        )
-        pull_and_write_from_cabi(last_date.strftime("%Y%m"))
+    print(f'Previously saved up through {last_date.strftime("%Y%m")} on s3')
+
+    # Every month after the last saved one, up to the current month
+    now = datetime.now()
+    year, month = last_date.year, last_date.month
+    missing = []
+    while (year, month) < (now.year, now.month):
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        missing.append(f"{year}{month:02d}")
+
+    # Months are independent downloads, so pull them in parallel
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(pull_and_write_from_cabi, missing))
@@ -82,7 +82,7 @@ def main():
     logger.info("=" * 70)
     logger.info("")
     logger.info("Aggregate files available:")
-    logger.info("  • station_daily.parquet")
+    logger.info("  • station_daily/ (partitioned by year/month)")
     logger.info("  • station_daily_detailed.parquet")
     logger.info("  • system_daily.parquet")
     logger.info("  • system_daily_detailed.parquet")
@@ -92,6 +92,7 @@ def main():
     logger.info("  • trip_patterns.parquet")
     logger.info("  • trip_duration_buckets.parquet")
     logger.info("  • time_aggregated.parquet")
+    logger.info("  • stations_facets.parquet")
     logger.info("")
     logger.info("Your Streamlit app is now ready with all features enabled! 🚀")
     logger.info("")
@@ -7,6 +7,7 @@ Respects API rate limits (1 request per second max).
 
 from __future__ import annotations
 
+import functools
 import os
 import time
 from io import BytesIO
@@ -22,6 +23,7 @@ PROC_BUCKET = os.getenv("S3_BUCKET_PROCESSED", "capital-bikeshare-manipulated")
 STATIONS_KEY = os.getenv("S3_KEY_STATIONS", "dimensions/stations.parquet")
 
 
+@functools.lru_cache(maxsize=1)
 def _s3() -> boto3.client:
     return boto3.client("s3")
 
@@ -146,12 +148,12 @@ def geocode_all_stations():
     # Save back to S3
     print("\nSaving updated stations to S3...")
     buf = BytesIO()
-    stations_updated.write_parquet(buf)
+    stations_updated.write_parquet(buf, compression="zstd", compression_level=3)
     buf.seek(0)
     _s3().put_object(
         Bucket=PROC_BUCKET,
         Key=STATIONS_KEY,
-        Body=buf.getvalue()
+        Body=buf,
     )
 
     print(f"✓ Geocoding complete! Updated stations saved to s3://{PROC_BUCKET}/{STATIONS_KEY}")
@@ -16,6 +16,15 @@ def _get_s3fs() -> s3fs.S3FileSystem:
     )
 
 
+def _storage_options() -> dict[str, str]:
+    """Credentials for Polars' native object-store reader (scan_parquet)."""
+    return {
+        "aws_access_key_id": st.secrets["AWS_ACCESS_KEY_ID"],
+        "aws_secret_access_key": st.secrets["AWS_SECRET_ACCESS_KEY"],
+        "aws_region": st.secrets["AWS_DEFAULT_REGION"],
+    }
+
+
 @st.cache_resource(ttl=86400)
 def read_parquet_from_s3_cached(path: str) -> pl.DataFrame:
     """
@@ -45,6 +54,17 @@ def read_parquet_from_s3(path: str) -> pl.DataFrame:
         return pl.read_parquet(f)
 
 
+@st.cache_resource(ttl=86400)
+def scan_parquet_from_s3(path: str) -> pl.LazyFrame:
+    """
+    Get a lazy scan over a parquet file on S3.
+
+    Nothing is downloaded until the plan is collected; reading the schema
+    (e.g. lf.columns) only fetches the Parquet footer.
+    """
+    return pl.scan_parquet(path, storage_options=_storage_options())
+
+
 @st.cache_data(ttl=86400, show_spinner=False)
 def read_parquet_filtered(path: str, filter_col: str, filter_value) -> pl.DataFrame:
     """
@@ -63,14 +83,80 @@ def read_parquet_filtered(path: str, filter_col: str, filter_value) -> pl.DataFr
     """
     # Use Polars lazy scan with S3 for predicate pushdown
     return (
-        pl.scan_parquet(
-            path,
-            storage_options={
-                "aws_access_key_id": st.secrets["AWS_ACCESS_KEY_ID"],
-                "aws_secret_access_key": st.secrets["AWS_SECRET_ACCESS_KEY"],
-                "aws_region": st.secrets["AWS_DEFAULT_REGION"],
-            },
-        )
+        pl.scan_parquet(path, storage_options=_storage_options())
         .filter(pl.col(filter_col) == filter_value)
         .collect()
     )
+
+
+def year_month_between(start_date, end_date) -> pl.Expr:
+    """
+    Predicate on Hive year=/month= partition columns covering [start_date, end_date].
+
+    Only plain column-vs-literal comparisons are used so Polars can prune
+    whole partitions from the path before opening any files.
+    """
+    after_start = (pl.col("year") > start_date.year) | (
+        (pl.col("year") == start_date.year) & (pl.col("month") >= start_date.month)
+    )
+    before_end = (pl.col("year") < end_date.year) | (
+        (pl.col("year") == end_date.year) & (pl.col("month") <= end_date.month)
+    )
+    return after_start & before_end
+
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def read_parquet_date_range(
+    path: str,
+    start_date,
+    end_date,
+    date_col: str = "date",
+    hive_partitioned: bool = False,
+) -> pl.DataFrame:
+    """
+    Read only the rows of a parquet file whose date falls in [start_date, end_date].
+
+    The filter sits directly on the scan, so Polars pushes it down to the
+    Parquet reader and skips row groups whose min/max statistics fall
+    outside the range instead of downloading the whole file.
+
+    Args:
+        path: S3 path (s3://bucket/key)
+        start_date: Inclusive lower bound
+        end_date: Inclusive upper bound
+        date_col: Name of the date column to filter on
+        hive_partitioned: Path is a year=*/month=* glob; also filter on the
+            partition columns so out-of-range months are never opened
+
+    Returns:
+        Filtered DataFrame
+    """
+    predicate = pl.col(date_col).is_between(start_date, end_date)
+    if hive_partitioned:
+        predicate = year_month_between(start_date, end_date) & predicate
+
+    return (
+        pl.scan_parquet(path, storage_options=_storage_options())
+        .filter(predicate)
+        .collect()
+    )
+
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def read_parquet_date_bounds(path: str, date_col: str = "date") -> tuple:
+    """
+    Return (min, max) of a date column without loading the rest of the file.
+
+    Only the single column is projected from the scan.
+    """
+    bounds = (
+        pl.scan_parquet(path, storage_options=_storage_options())
+        .select(
+            [
+                pl.col(date_col).min().alias("min"),
+                pl.col(date_col).max().alias("max"),
+            ]
+        )
+        .collect()
+    )
+    return bounds["min"][0], bounds["max"][0]
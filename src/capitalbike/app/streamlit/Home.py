@@ -17,6 +17,23 @@ def load_system_daily():
     )
 
 
+@st.cache_data(ttl=3600, show_spinner=False)
+def build_trend_figure(start_date, end_date, aggregation: str, metric: str, show_trend: bool):
+    """
+    Build the system trend chart for one filter combination.
+
+    Resampling and the trend fit run once per (date range, aggregation,
+    metric, trend) and are served from cache on later reruns.
+    """
+    df_range = load_system_daily().filter(pl.col("date").is_between(start_date, end_date))
+    return create_system_timeseries(
+        df_range,
+        aggregation=aggregation,
+        metric=metric,
+        show_trend=show_trend,
+    )
+
+
 df = load_system_daily()
 
 # Get date range for filters
@@ -93,12 +110,7 @@ col4.metric("Avg Daily Trips", f"{avg_daily_trips:,.0f}")
 st.subheader("System-Wide Trends")
 
 if len(df_filtered) > 0:
-    fig = create_system_timeseries(
-        df_filtered,
-        aggregation=aggregation,
-        metric=metric,
-        show_trend=show_trend,
-    )
+    fig = build_trend_figure(start_date, end_date, aggregation, metric, show_trend)
 
     st.plotly_chart(fig, width='stretch')
 
@@ -9,7 +9,13 @@ import streamlit as st
 import polars as pl
 from streamlit_folium import st_folium
 
-from src.capitalbike.app.io import read_parquet_from_s3_cached, read_parquet_filtered
+from src.capitalbike.app.io import (
+    read_parquet_from_s3_cached,
+    read_parquet_filtered,
+    read_parquet_date_bounds,
+    scan_parquet_from_s3,
+    year_month_between,
+)
 from src.capitalbike.viz.maps import create_station_map, create_route_map
 from src.capitalbike.viz.station_analysis import (
     create_hourly_heatmap,
@@ -50,8 +56,19 @@ if "filter_rideable_types" not in st.session_state:
 # --------------------------------------------------
 # Data Loading Functions
 # --------------------------------------------------
-# Note: Using read_parquet_from_s3_cached (cache_resource) to avoid
-# serialization overhead. This saves ~50% memory vs cache_data.
+# Note: The station dimension is small and feeds Python-side selectbox lists,
+# so it is read eagerly with read_parquet_from_s3_cached (cache_resource).
+# The large aggregates are kept as lazy scans so date/station filters and
+# column selections are pushed down into the Parquet reader.
+
+def _agg_path(name: str) -> str:
+    return f"s3://{st.secrets['S3_BUCKET_PROCESSED']}/aggregates/{name}.parquet"
+
+
+def _station_daily_path() -> str:
+    # Hive-partitioned by year/month, sorted by station_id within each month
+    return f"s3://{st.secrets['S3_BUCKET_PROCESSED']}/aggregates/station_daily/year=*/month=*/part.parquet"
+
 
 def load_stations():
     """Load station dimension data (~0.1 MB)."""
@@ -61,10 +78,17 @@ def load_stations():
 
 
 def load_station_daily():
-    """Load station-level daily metrics (~190 MB)."""
-    return read_parquet_from_s3_cached(
-        f"s3://{st.secrets['S3_BUCKET_PROCESSED']}/aggregates/station_daily.parquet"
-    )
+    """Lazily scan station-level daily metrics (~190 MB in full)."""
+    return scan_parquet_from_s3(_station_daily_path())
+
+
+def load_station_daily_for_station(station_id: int):
+    """Load daily metrics for a single station only (row groups pruned on station_id)."""
+    return read_parquet_filtered(
+        _station_daily_path(),
+        filter_col="station_id",
+        filter_value=station_id,
+    ).sort("date")
 
 
 def load_station_hourly_for_station(station_id: int):
@@ -75,32 +99,152 @@ def load_station_hourly_for_station(station_id: int):
     Only the rows for the requested station are loaded (~2-5 MB per station).
     """
     return read_parquet_filtered(
-        f"s3://{st.secrets['S3_BUCKET_PROCESSED']}/aggregates/station_hourly.parquet",
+        _agg_path("station_hourly"),
         filter_col="station_id",
         filter_value=station_id,
     )
 
 
 def load_station_routes():
-    """Load popular routes data (~2 MB)."""
+    """Lazily scan popular routes data (~2 MB); None if not built yet."""
     try:
-        return read_parquet_from_s3_cached(
-            f"s3://{st.secrets['S3_BUCKET_PROCESSED']}/aggregates/station_routes.parquet"
-        )
+        routes_lf = scan_parquet_from_s3(_agg_path("station_routes"))
+        routes_lf.columns  # Touch the footer so a missing file fails here
+        return routes_lf
     except Exception:
         return None
 
 
+def load_station_routes_for_station(station_id: int, is_outbound: bool):
+    """Load routes leaving (outbound) or arriving at (inbound) a single station."""
+    return read_parquet_filtered(
+        _agg_path("station_routes"),
+        filter_col="start_station_id" if is_outbound else "end_station_id",
+        filter_value=station_id,
+    ).sort("trip_count", descending=True)
+
+
 def load_station_daily_detailed():
-    """Load detailed station daily metrics (~574 MB)."""
+    """Lazily scan detailed station daily metrics (~574 MB in full); None if not built yet."""
     try:
-        return read_parquet_from_s3_cached(
-            f"s3://{st.secrets['S3_BUCKET_PROCESSED']}/aggregates/station_daily_detailed.parquet"
-        )
+        detailed_lf = scan_parquet_from_s3(_agg_path("station_daily_detailed"))
+        detailed_lf.columns  # Touch the footer so a missing file fails here
+        return detailed_lf
     except Exception:
         return None
 
 
+@st.cache_data(ttl=3600)
+def station_coords() -> tuple[dict, dict]:
+    """station_id -> lat and station_id -> lng lookups from the dimension."""
+    stations_df = load_stations()
+    ids = stations_df["station_id"].to_list()
+    return (
+        dict(zip(ids, stations_df["lat"].to_list())),
+        dict(zip(ids, stations_df["lng"].to_list())),
+    )
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def aggregate_station_metrics(
+    start_date, end_date, member_types: tuple[str, ...], rideable_types: tuple[str, ...]
+) -> pl.DataFrame:
+    """
+    Roll station daily metrics up to one row per station for the map.
+
+    Keyed only on the data filters, so changing the metric or colour scheme
+    (or switching views and back) reuses the aggregation.
+    """
+    detailed_lf = load_station_daily_detailed()
+    daily_lf = load_station_daily()
+    lat_by_id, lng_by_id = station_coords()
+
+    # Use detailed data if available, otherwise fall back to basic aggregates
+    if detailed_lf is not None:
+        # Filter detailed daily data by date and member/bike type
+        daily_filtered = detailed_lf.filter(
+            pl.col("date").is_between(start_date, end_date)
+            & pl.col("member_type").is_in(list(member_types))
+            & pl.col("rideable_type").is_in(list(rideable_types))
+        )
+    else:
+        # Fallback: Use basic daily data without advanced filters
+        # year/month prune whole partitions; the date bound trims the edge months
+        daily_filtered = daily_lf.filter(
+            year_month_between(start_date, end_date)
+            & pl.col("date").is_between(start_date, end_date)
+        ).with_columns([
+            # Use same duration for both checkout and return (no separation)
+            pl.col("avg_duration_sec").alias("avg_duration_checkout_sec"),
+            pl.col("avg_duration_sec").alias("avg_duration_return_sec"),
+        ])
+
+    # Aggregate by station: one group_by, derived columns added afterwards.
+    # Row order is irrelevant for the map, so let the hash aggregation run
+    # without preserving first-seen order.
+    return (
+        daily_filtered.group_by("station_id", maintain_order=False)
+        .agg([
+            pl.sum("num_checkouts").alias("total_checkouts"),
+            pl.sum("num_returns").alias("total_returns"),
+            pl.mean("avg_duration_checkout_sec").alias("avg_duration_checkout_sec"),
+            pl.mean("avg_duration_return_sec").alias("avg_duration_return_sec"),
+            pl.first("station_name").alias("station_name"),
+        ])
+        .with_columns([
+            (pl.col("total_checkouts") - pl.col("total_returns")).alias("net_flow"),
+            (pl.col("avg_duration_checkout_sec") / 60).alias("avg_duration_checkout_min"),
+            (pl.col("avg_duration_return_sec") / 60).alias("avg_duration_return_min"),
+            # Keep avg_duration_sec for backward compatibility (use checkout duration)
+            (pl.col("avg_duration_checkout_sec")).alias("avg_duration_sec"),
+        ])
+        .collect()
+        # Attach coordinates with a keyed lookup on the small per-station result
+        .with_columns([
+            pl.col("station_id").replace(lat_by_id, default=None, return_dtype=pl.Float64).alias("lat"),
+            pl.col("station_id").replace(lng_by_id, default=None, return_dtype=pl.Float64).alias("lng"),
+        ])
+    )
+
+
+@st.cache_data(ttl=3600)
+def station_index() -> dict:
+    """
+    Precompute the Deep Dive selector lists and a name -> row lookup.
+
+    Returns:
+        Dict with "all_station_names" (sorted), "zip_to_station_names"
+        (zip -> sorted names, only when geocoded) and "name_to_row_idx"
+        (station_name -> first row index in the stations dimension).
+    """
+    stations_df = load_stations()
+
+    name_to_row_idx = {}
+    for i, name in enumerate(stations_df["station_name"].to_list()):
+        name_to_row_idx.setdefault(name, i)
+
+    zip_to_station_names = {}
+    if "zip_code" in stations_df.columns:
+        by_zip = (
+            stations_df.filter(
+                pl.col("zip_code").is_not_null()
+                & ~pl.col("zip_code").is_in(["", "Unknown"])
+            )
+            .group_by("zip_code")
+            .agg(pl.col("station_name").unique().sort())
+            .sort("zip_code")
+        )
+        zip_to_station_names = dict(by_zip.iter_rows())
+
+    return {
+        "all_station_names": sorted(
+            n for n in name_to_row_idx if n is not None
+        ),
+        "zip_to_station_names": zip_to_station_names,
+        "name_to_row_idx": name_to_row_idx,
+    }
+
+
 # --------------------------------------------------
 # Configuration Screen (shown before data loads)
 # --------------------------------------------------
@@ -196,13 +340,14 @@ with progress_container.container():
     stations_df = load_stations()
 
     progress_bar.progress(25, text="Loading daily station metrics...")
-    daily_df = load_station_daily()
+    daily_lf = load_station_daily()
+    min_date, max_date = read_parquet_date_bounds(_station_daily_path())
 
     progress_bar.progress(50, text="Loading route data...")
-    routes_df = load_station_routes()
+    routes_lf = load_station_routes()
 
     progress_bar.progress(75, text="Loading detailed metrics...")
-    detailed_df = load_station_daily_detailed()
+    detailed_lf = load_station_daily_detailed()
 
     progress_bar.progress(100, text="Data loaded!")
     # Note: Hourly data (1.6GB) is loaded on-demand per station in Deep Dive
@@ -210,10 +355,6 @@ with progress_container.container():
 # Clear the progress display
 progress_container.empty()
 
-# Get date range for filters
-min_date = daily_df["date"].min()
-max_date = daily_df["date"].max()
-
 # Set date defaults if not already set
 if st.session_state.filter_start_date is None:
     st.session_state.filter_start_date = min_date
@@ -271,7 +412,7 @@ with st.sidebar.form("filter_form"):
     )
 
     # Member and bike type filters
-    if detailed_df is not None:
+    if detailed_lf is not None:
         st.caption("**Advanced Filters**")
         sidebar_member = st.multiselect(
             "Member Types",
@@ -365,75 +506,22 @@ if view_mode == "Station Map":
 
     # Only recalculate if filters have changed
     if st.session_state.map_filter_key != filter_key:
-        # Use detailed data if available, otherwise fall back to basic aggregates
-        if detailed_df is not None:
-            # Filter detailed daily data by date and member/bike type
-            daily_filtered = detailed_df.filter(
-                pl.col("date").is_between(start_date, end_date)
-                & pl.col("member_type").is_in(member_filter)
-                & pl.col("rideable_type").is_in(rideable_filter)
-            )
+        station_agg = aggregate_station_metrics(
+            start_date,
+            end_date,
+            tuple(sorted(member_filter)),
+            tuple(sorted(rideable_filter)),
+        )
 
-            # Aggregate by station
-            station_agg = (
-                daily_filtered.group_by("station_id")
-                .agg([
-                    pl.sum("num_checkouts").alias("total_checkouts"),
-                    pl.sum("num_returns").alias("total_returns"),
-                    pl.mean("avg_duration_checkout_sec").alias("avg_duration_checkout_sec"),
-                    pl.mean("avg_duration_return_sec").alias("avg_duration_return_sec"),
-                    pl.first("station_name").alias("station_name"),
-                ])
-                .with_columns([
-                    (pl.col("total_checkouts") - pl.col("total_returns")).alias("net_flow"),
-                    (pl.col("avg_duration_checkout_sec") / 60).alias("avg_duration_checkout_min"),
-                    (pl.col("avg_duration_return_sec") / 60).alias("avg_duration_return_min"),
-                    # Keep avg_duration_sec for backward compatibility (use checkout duration)
-                    (pl.col("avg_duration_checkout_sec")).alias("avg_duration_sec"),
-                ])
-                .join(
-                    stations_df.select(["station_id", "lat", "lng"]),
-                    on="station_id",
-                    how="left",
-                    coalesce=True,
-                )
-            )
-        else:
-            # Fallback: Use basic daily_df without advanced filters
-            daily_filtered = daily_df.filter(pl.col("date").is_between(start_date, end_date))
-
-            # Aggregate by station (old logic)
-            station_agg = (
-                daily_filtered.group_by("station_id")
-                .agg([
-                    pl.sum("num_checkouts").alias("total_checkouts"),
-                    pl.sum("num_returns").alias("total_returns"),
-                    pl.mean("avg_duration_sec").alias("avg_duration_sec"),
-                    pl.first("station_name").alias("station_name"),
-                ])
-                .with_columns([
-                    (pl.col("total_checkouts") - pl.col("total_returns")).alias("net_flow"),
-                    # Use same duration for both checkout and return (no separation)
-                    (pl.col("avg_duration_sec") / 60).alias("avg_duration_checkout_min"),
-                    (pl.col("avg_duration_sec") / 60).alias("avg_duration_return_min"),
-                ])
-                .join(
-                    stations_df.select(["station_id", "lat", "lng"]),
-                    on="station_id",
-                    how="left",
-                    coalesce=True,
-                )
-            )
+        n_stations = station_agg.height
 
         # Create map with rich tooltips showing multiple metrics
-        use_clustering = len(station_agg) > 100
-
-        if len(station_agg) > 0:
+        # (markers are clustered automatically for large station sets)
+        if n_stations > 0:
             folium_map = create_station_map(
                 station_agg,
                 metric_col=metric,
                 color_scheme=color_scheme,
-                use_clustering=use_clustering,
                 tooltip_cols={
                     "total_checkouts": "Checkouts",
                     "total_returns": "Returns",
@@ -453,9 +541,10 @@ if view_mode == "Station Map":
         # Use cached data (filters haven't changed)
         station_agg = st.session_state.cached_station_agg
         folium_map = st.session_state.cached_folium_map
+        n_stations = station_agg.height
 
     # Display station count
-    st.info(f"Showing {len(station_agg):,} stations")
+    st.info(f"Showing {n_stations:,} stations")
 
     # Render map if available
     if folium_map is not None:
@@ -479,27 +568,25 @@ else:
     # Filters for station selection
     col1, col2 = st.columns([3, 1])
 
+    idx = station_index()
+
     with col2:
         # Zip code filter (if geocoding data is available)
-        if "zip_code" in stations_df.columns:
-            zip_codes = sorted([z for z in stations_df["zip_code"].unique().to_list() if z and z != "Unknown"])
+        if idx["zip_to_station_names"]:
             selected_zip = st.selectbox(
                 "Filter by Zip Code",
-                ["All"] + zip_codes,
+                ["All"] + list(idx["zip_to_station_names"]),
                 help="Filter stations by zip code",
             )
-
-            if selected_zip != "All":
-                filtered_stations = stations_df.filter(pl.col("zip_code") == selected_zip)
-            else:
-                filtered_stations = stations_df
         else:
-            filtered_stations = stations_df
             selected_zip = "All"
 
     with col1:
         # Station selector
-        station_list = sorted(filtered_stations["station_name"].unique().to_list())
+        if selected_zip != "All":
+            station_list = idx["zip_to_station_names"][selected_zip]
+        else:
+            station_list = idx["all_station_names"]
 
         # Use session state for default selection if available
         default_index = 0
@@ -516,19 +603,21 @@ else:
         # Update session state when user changes selection
         st.session_state.selected_station_name = selected_station_name
 
-    # Get station metadata
-    station_info = stations_df.filter(pl.col("station_name") == selected_station_name)
+    # Get station metadata (O(1) lookup instead of a filter scan)
+    row_idx = idx["name_to_row_idx"].get(selected_station_name)
 
-    if len(station_info) == 0:
+    if row_idx is None:
         st.error("Station not found.")
         st.stop()
 
-    station_id = station_info["station_id"][0]
-    station_lat = station_info["lat"][0]
-    station_lng = station_info["lng"][0]
+    station_info = stations_df.row(row_idx, named=True)
+
+    station_id = station_info["station_id"]
+    station_lat = station_info["lat"]
+    station_lng = station_info["lng"]
 
     # Filter data for this station
-    station_daily = daily_df.filter(pl.col("station_id") == station_id).sort("date")
+    station_daily = load_station_daily_for_station(station_id)
     # Hourly data loaded on-demand (saves 1.6GB memory vs loading full dataset)
     station_hourly = load_station_hourly_for_station(station_id)
 
@@ -546,8 +635,8 @@ else:
         metrics = create_station_overview_metrics(station_daily)
 
         # Calculate trip breakdown
-        total_checkouts = station_daily["num_checkouts"].sum()
-        total_returns = station_daily["num_returns"].sum() if "num_returns" in station_daily.columns else total_checkouts
+        total_checkouts = station_daily.get_column("num_checkouts").sum()
+        total_returns = station_daily.get_column("num_returns").sum() if "num_returns" in station_daily.columns else total_checkouts
         total_net_flow = total_checkouts - total_returns
 
         # Display metrics
@@ -561,45 +650,30 @@ else:
         col2.metric("Active Days", f"{metrics['active_days']:,}")
         col3.metric("Avg Daily Trips", f"{metrics['avg_daily_trips']:.0f}")
 
-        # Station info
-        first_seen = station_info['earliest_seen'][0]
-        last_seen = station_info['latest_seen'][0]
-
-        # Format dates without seconds
-        if hasattr(first_seen, 'strftime'):
-            first_seen_str = first_seen.strftime('%Y-%m-%d')
+        # Station info (first_seen_str / status are precomputed in the dimension)
+        if "status" in station_info:
+            first_seen_str = station_info["first_seen_str"]
+            station_status = station_info["status"]
         else:
-            first_seen_str = str(first_seen).split(' ')[0]
-
-        # Determine if station is currently active
-        # If last seen is within the last month of available data, consider it active
-        from datetime import datetime, timedelta
-
-        # Get the most recent date in the dataset
-        most_recent_date = max_date
-
-        # Calculate one month ago from most recent date
-        one_month_ago = most_recent_date - timedelta(days=30)
+            # Dimension built before these columns existed
+            from datetime import timedelta
 
-        # Determine status
-        if hasattr(last_seen, 'date'):
-            last_seen_date = last_seen.date()
-        else:
-            last_seen_date = last_seen
+            first_seen_str = station_info["earliest_seen"].strftime("%Y-%m-%d")
+            last_seen = station_info["latest_seen"]
+            if last_seen.date() >= max_date - timedelta(days=30):
+                station_status = "active"
+            else:
+                station_status = last_seen.strftime("%Y-%m-%d")
 
-        if last_seen_date >= one_month_ago:
+        if station_status == "active":
             status_str = "**Status**: 🟢 Currently Active"
         else:
-            if hasattr(last_seen, 'strftime'):
-                discontinued_date = last_seen.strftime('%Y-%m-%d')
-            else:
-                discontinued_date = str(last_seen).split(' ')[0]
-            status_str = f"**Status**: 🔴 Discontinued {discontinued_date}"
+            status_str = f"**Status**: 🔴 Discontinued {station_status}"
 
         # Get geocoding info if available
-        city = station_info["city"][0] if "city" in station_info.columns else "Unknown"
-        state = station_info["state"][0] if "state" in station_info.columns else "Unknown"
-        zip_code = station_info["zip_code"][0] if "zip_code" in station_info.columns else "Unknown"
+        city = station_info.get("city", "Unknown")
+        state = station_info.get("state", "Unknown")
+        zip_code = station_info.get("zip_code", "Unknown")
 
         # Handle stations with missing coordinates
         if station_lat is not None and station_lng is not None:
@@ -687,7 +761,7 @@ else:
         The map shows {selected_station_name} as a ⭐ red star, with lines showing the most popular routes.
         """)
 
-        if routes_df is not None:
+        if routes_lf is not None:
             # Direction selector
             route_direction = st.radio(
                 "Route Direction",
@@ -700,9 +774,7 @@ else:
 
             if is_outbound:
                 # Filter routes starting from this station
-                station_routes = routes_df.filter(
-                    pl.col("start_station_id") == station_id
-                ).sort("trip_count", descending=True)
+                station_routes = load_station_routes_for_station(station_id, is_outbound=True)
 
                 header_text = "Top 10 Destinations"
                 other_station_col = "end_station_name"
@@ -711,38 +783,10 @@ else:
                 origin_lng_val = station_lng
             else:
                 # Filter routes ending at this station
-                station_routes = routes_df.filter(
-                    pl.col("end_station_id") == station_id
-                ).sort("trip_count", descending=True)
-
-                # For inbound, we need to create a modified dataframe that swaps columns
-                # so the visualization code works correctly
-                station_routes = station_routes.select([
-                    pl.col("start_station_id").alias("temp_start_id"),
-                    pl.col("start_station_name").alias("end_station_name"),  # Origins become "destinations" in the chart
-                    pl.col("start_lat").alias("temp_start_lat"),
-                    pl.col("start_lng").alias("temp_start_lng"),
-                    pl.col("end_station_id").alias("temp_end_id"),
-                    pl.col("end_station_name").alias("temp_end_name"),
-                    pl.col("end_lat").alias("temp_end_lat"),
-                    pl.col("end_lng").alias("temp_end_lng"),
-                    pl.col("trip_count"),
-                    pl.col("avg_duration_sec"),
-                ]).select([
-                    pl.col("temp_end_id").alias("start_station_id"),
-                    pl.col("temp_end_name").alias("start_station_name"),
-                    pl.col("temp_end_lat").alias("start_lat"),
-                    pl.col("temp_end_lng").alias("start_lng"),
-                    pl.col("temp_start_id").alias("end_station_id"),
-                    pl.col("end_station_name"),
-                    pl.col("temp_start_lat").alias("end_lat"),
-                    pl.col("temp_start_lng").alias("end_lng"),
-                    pl.col("trip_count"),
-                    pl.col("avg_duration_sec"),
-                ])
+                station_routes = load_station_routes_for_station(station_id, is_outbound=False)
 
                 header_text = "Top 10 Origins"
-                other_station_col = "end_station_name"
+                other_station_col = "start_station_name"
                 origin_name = selected_station_name
                 origin_lat_val = station_lat
                 origin_lng_val = station_lng
@@ -771,6 +815,7 @@ else:
                     origin_lat=origin_lat_val,
                     origin_lng=origin_lng_val,
                     top_n=10,
+                    is_outbound=is_outbound,
                 )
                 st_folium(route_map, width=1200, height=500, key="route_map", returned_objects=[])
             else:
@@ -1,3 +1,4 @@
+import io
 import sys
 from pathlib import Path
 
@@ -9,7 +10,12 @@ import streamlit as st
 import polars as pl
 from datetime import timedelta
 
-from src.capitalbike.app.io import read_parquet_from_s3_cached
+from src.capitalbike.app.io import (
+    read_parquet_from_s3_cached,
+    scan_parquet_from_s3,
+    read_parquet_date_range,
+    read_parquet_date_bounds,
+)
 
 
 st.title("Station Table")
@@ -26,29 +32,95 @@ if "include_electric_stats" not in st.session_state:
 # Data Loading Functions (using cache_resource for memory efficiency)
 # --------------------------------------------------
 def load_stations():
-    """Load station dimension data (~0.1 MB)."""
-    return read_parquet_from_s3_cached(
+    """Lazily scan station dimension data (~0.1 MB); collected only when joined."""
+    return scan_parquet_from_s3(
         f"s3://{st.secrets['S3_BUCKET_PROCESSED']}/dimensions/stations.parquet"
     )
 
 
-def load_station_daily():
-    """Load station-level daily metrics (~190 MB)."""
-    return read_parquet_from_s3_cached(
-        f"s3://{st.secrets['S3_BUCKET_PROCESSED']}/aggregates/station_daily.parquet"
+def load_station_facets():
+    """Load precomputed sidebar options (zip codes, cities) (~few KB)."""
+    try:
+        return read_parquet_from_s3_cached(
+            f"s3://{st.secrets['S3_BUCKET_PROCESSED']}/dimensions/stations_facets.parquet"
+        )
+    except Exception:
+        return None
+
+
+def _station_daily_path() -> str:
+    # Hive-partitioned by year/month, sorted by station_id within each month
+    return f"s3://{st.secrets['S3_BUCKET_PROCESSED']}/aggregates/station_daily/year=*/month=*/part.parquet"
+
+
+def load_station_daily_bounds():
+    """Load only the (min, max) date of the station daily metrics."""
+    return read_parquet_date_bounds(_station_daily_path())
+
+
+def load_station_daily(start_date, end_date):
+    """Load station-level daily metrics (~190 MB in full) for the date range only."""
+    return read_parquet_date_range(
+        _station_daily_path(), start_date, end_date, hive_partitioned=True
     )
 
 
-def load_station_daily_detailed():
-    """Load detailed station daily metrics (~574 MB) - only load when needed."""
+def load_station_daily_detailed(start_date, end_date):
+    """Load detailed station daily metrics (~574 MB in full) for the date range only."""
     try:
-        return read_parquet_from_s3_cached(
-            f"s3://{st.secrets['S3_BUCKET_PROCESSED']}/aggregates/station_daily_detailed.parquet"
+        return read_parquet_date_range(
+            f"s3://{st.secrets['S3_BUCKET_PROCESSED']}/aggregates/station_daily_detailed.parquet",
+            start_date,
+            end_date,
         )
     except Exception:
         return None
 
 
+@st.cache_data(ttl=3600)
+def _make_column_lists(station_columns: tuple[str, ...]) -> tuple[tuple[str, ...], tuple[str, ...]]:
+    """
+    Build the (join select, display) column orders for the station table.
+
+    Geocoding columns (city/state/zip_code) only exist once the station
+    dimension has been geocoded, so they are included when present. Keyed on
+    the stations schema, which is fixed for the life of the cached file.
+    """
+    geo_cols = tuple(c for c in ("city", "state", "zip_code") if c in station_columns)
+
+    select_cols = (
+        ("station_id", "station_name")
+        + geo_cols
+        + (
+            "lat",
+            "lng",
+            "earliest_seen",
+            "latest_seen",
+            "total_checkouts",
+            "total_returns",
+            "total_trips",
+            "net_flow",
+            "avg_duration_min",
+            "total_distinct_bikes",
+            "pct_checkouts_electric",
+            "pct_returns_electric",
+        )
+    )
+
+    display_col_names = (
+        ("station_name", "status")
+        + geo_cols
+        + (
+            "lat", "lng", "total_trips", "total_checkouts", "total_returns",
+            "net_flow", "avg_duration_min", "total_distinct_bikes",
+            "pct_checkouts_electric", "pct_returns_electric",
+            "earliest_seen", "latest_seen",
+        )
+    )
+
+    return select_cols, display_col_names
+
+
 # --------------------------------------------------
 # Configuration Screen (shown before data loads)
 # --------------------------------------------------
@@ -95,17 +167,13 @@ with progress_container.container():
     st.info("Loading Station Table data...")
 
     progress_bar = st.progress(0, text="Loading station locations...")
-    stations_df = load_stations()
+    stations_lf = load_stations()
+    station_columns = tuple(stations_lf.columns)
 
-    progress_bar.progress(50, text="Loading daily station metrics...")
-    daily_df = load_station_daily()
+    facets_df = load_station_facets()
 
-    # Only load detailed data if user opted in
-    if st.session_state.include_electric_stats:
-        progress_bar.progress(75, text="Loading electric bike statistics...")
-        detailed_df = load_station_daily_detailed()
-    else:
-        detailed_df = None
+    progress_bar.progress(50, text="Loading available date range...")
+    min_date, max_date = load_station_daily_bounds()
 
     progress_bar.progress(100, text="Data loaded!")
 
@@ -116,10 +184,6 @@ if st.sidebar.button("Reset Options", use_container_width=True):
     st.session_state.station_table_entered = False
     st.rerun()
 
-# Get date range for filters
-min_date = daily_df["date"].min()
-max_date = daily_df["date"].max()
-
 # --------------------------------------------------
 # Sidebar Filters
 # --------------------------------------------------
@@ -158,9 +222,33 @@ min_trips = st.sidebar.number_input(
     help="Filter out stations with fewer than this many total trips",
 )
 
+# Zip code / city options come from the build-time facets table when present.
+# Otherwise derive both lists from the station dimension in a single lazy pass.
+if facets_df is None:
+    facets_df = stations_lf.select(
+        [
+            (
+                pl.col(col)
+                .filter(
+                    pl.col(col).is_not_null()
+                    & (pl.col(col) != "")
+                    & (pl.col(col) != "Unknown")
+                )
+                .unique()
+                .sort()
+                .implode()
+                if col in station_columns
+                else pl.lit([], dtype=pl.List(pl.Utf8))
+            ).alias(alias)
+            for col, alias in [("zip_code", "zip_codes"), ("city", "cities")]
+        ]
+    ).collect()
+
+zip_codes = facets_df["zip_codes"][0].to_list()
+cities = facets_df["cities"][0].to_list()
+
 # Zip code filter (if available)
-if "zip_code" in stations_df.columns:
-    zip_codes = sorted([z for z in stations_df["zip_code"].unique().to_list() if z and z != "Unknown"])
+if "zip_code" in station_columns:
     selected_zips = st.sidebar.multiselect(
         "Zip Codes",
         zip_codes,
@@ -171,8 +259,7 @@ else:
     selected_zips = []
 
 # City filter (if available)
-if "city" in stations_df.columns:
-    cities = sorted([c for c in stations_df["city"].unique().to_list() if c and c != "Unknown"])
+if "city" in station_columns:
     selected_cities = st.sidebar.multiselect(
         "Cities",
         cities,
@@ -185,8 +272,15 @@ else:
 # --------------------------------------------------
 # Calculate Station Metrics
 # --------------------------------------------------
-# Filter daily data by date range
-daily_filtered = daily_df.filter(pl.col("date").is_between(start_date, end_date))
+# Load daily data for the selected date range (filter pushed into the scan)
+with st.spinner("Loading daily station metrics..."):
+    daily_filtered = load_station_daily(start_date, end_date)
+
+    # Only load detailed data if user opted in
+    if st.session_state.include_electric_stats:
+        detailed_filtered = load_station_daily_detailed(start_date, end_date)
+    else:
+        detailed_filtered = None
 
 # Aggregate metrics by station
 station_metrics = (
@@ -211,9 +305,7 @@ station_metrics = (
 
 # Calculate electric bike percentages (post-2020 data only)
 # Only calculate if detailed data is available
-if detailed_df is not None:
-    detailed_filtered = detailed_df.filter(pl.col("date").is_between(start_date, end_date))
-
+if detailed_filtered is not None:
     electric_metrics = (
         detailed_filtered.filter(
             (pl.col("rideable_type").is_not_null()) &
@@ -261,87 +353,65 @@ else:
     ])
 
 # Join with station metadata
-# Conditionally include geocoding columns if they exist
-select_cols = [
-    "station_id",
-    "station_name",
-    "lat",
-    "lng",
-    "earliest_seen",
-    "latest_seen",
-    "total_checkouts",
-    "total_returns",
-    "total_trips",
-    "net_flow",
-    "avg_duration_min",
-    "total_distinct_bikes",
-    "pct_checkouts_electric",
-    "pct_returns_electric",
-]
-
-if "city" in stations_df.columns:
-    select_cols.insert(2, "city")
-if "state" in stations_df.columns:
-    select_cols.insert(3, "state")
-if "zip_code" in stations_df.columns:
-    select_cols.insert(4, "zip_code")
-
-station_table = stations_df.join(
-    station_metrics, on="station_id", how="left", coalesce=True
-).select(select_cols)
-
-# Fill nulls for stations with no activity in the selected date range
-station_table = station_table.with_columns(
-    [
-        pl.col("total_checkouts").fill_null(0),
-        pl.col("total_returns").fill_null(0),
-        pl.col("total_trips").fill_null(0),
-        pl.col("net_flow").fill_null(0),
-        pl.col("avg_duration_min").fill_null(0),
-        pl.col("total_distinct_bikes").fill_null(0),
-    ]
-)
-
-# Add status column
-station_table = station_table.with_columns(
-    pl.when(pl.col("latest_seen") >= one_month_ago)
-    .then(pl.lit("Active"))
-    .otherwise(pl.lit("Discontinued"))
-    .alias("status")
-)
+select_cols, display_col_names = _make_column_lists(station_columns)
 
-# Apply filters
+# Sidebar filters, AND'd into a single predicate
+filter_preds = []
 if "Active" not in status_filter:
-    station_table = station_table.filter(pl.col("status") != "Active")
+    filter_preds.append(pl.col("status") != "Active")
 if "Discontinued" not in status_filter:
-    station_table = station_table.filter(pl.col("status") != "Discontinued")
+    filter_preds.append(pl.col("status") != "Discontinued")
 
 if min_trips > 0:
-    station_table = station_table.filter(pl.col("total_trips") >= min_trips)
+    filter_preds.append(pl.col("total_trips") >= min_trips)
 
 # Apply zip code filter
-if selected_zips and "zip_code" in station_table.columns:
-    station_table = station_table.filter(pl.col("zip_code").is_in(selected_zips))
+if selected_zips and "zip_code" in select_cols:
+    filter_preds.append(pl.col("zip_code").is_in(selected_zips))
 
 # Apply city filter
-if selected_cities and "city" in station_table.columns:
-    station_table = station_table.filter(pl.col("city").is_in(selected_cities))
+if selected_cities and "city" in select_cols:
+    filter_preds.append(pl.col("city").is_in(selected_cities))
+
+station_table = (
+    stations_lf
+    .join(station_metrics.lazy(), on="station_id", how="left", coalesce=True)
+    .select(list(select_cols))
+    # Fill nulls for stations with no activity in the selected date range
+    .with_columns(
+        [
+            pl.col("total_checkouts").fill_null(0),
+            pl.col("total_returns").fill_null(0),
+            pl.col("total_trips").fill_null(0),
+            pl.col("net_flow").fill_null(0),
+            pl.col("avg_duration_min").fill_null(0),
+            pl.col("total_distinct_bikes").fill_null(0),
+        ]
+    )
+    # Add status column
+    .with_columns(
+        pl.when(pl.col("latest_seen") >= one_month_ago)
+        .then(pl.lit("Active"))
+        .otherwise(pl.lit("Discontinued"))
+        .alias("status")
+    )
+    .filter(pl.all_horizontal(filter_preds) if filter_preds else pl.lit(True))
+    .collect()
+)
 
 # --------------------------------------------------
 # Display Summary Stats
 # --------------------------------------------------
-st.markdown(f"### Station Overview ({len(station_table):,} stations)")
+n_stations = station_table.height
+st.markdown(f"### Station Overview ({n_stations:,} stations)")
+
+# Count both statuses in a single group_by pass
+status_counts = dict(station_table.group_by("status").len().iter_rows())
 
 col1, col2, col3, col4 = st.columns(4)
-col1.metric("Total Stations", f"{len(station_table):,}")
-col2.metric(
-    "Active Stations",
-    f"{len(station_table.filter(pl.col('status') == 'Active')):,}",
-)
-col3.metric(
-    "Discontinued",
-    f"{len(station_table.filter(pl.col('status') == 'Discontinued')):,}",
-)
+col1.metric("Total Stations", f"{n_stations:,}")
+col2.metric("Active Stations", f"{status_counts.get('Active', 0):,}")
+col3.metric("Discontinued", f"{status_counts.get('Discontinued', 0):,}")
 col4.metric(
     "Total Trips (all stations)",
     f"{station_table['total_trips'].sum():,.0f}",
@@ -399,29 +469,6 @@ station_table_sorted = station_table.sort(
 # --------------------------------------------------
 st.markdown("---")
 
-# Format the dataframe for display
-# Build list of columns to display (strings only, build expressions later)
-display_col_names = ["station_name", "status"]
-
-# Add geocoding columns if they exist
-if "city" in station_table_sorted.columns:
-    display_col_names.append("city")
-if "state" in station_table_sorted.columns:
-    display_col_names.append("state")
-if "zip_code" in station_table_sorted.columns:
-    display_col_names.append("zip_code")
-
-# Add remaining metric columns
-display_col_names.extend([
-    "lat", "lng", "total_trips", "total_checkouts", "total_returns",
-    "net_flow", "avg_duration_min", "total_distinct_bikes",
-    "pct_checkouts_electric", "pct_returns_electric",
-    "earliest_seen", "latest_seen"
-])
-
-# Convert to pandas first, then format
-display_pandas = station_table_sorted.select(display_col_names).to_pandas()
-
 # Rename columns for display
 column_rename_map = {
     "station_name": "Station Name",
@@ -443,27 +490,26 @@ column_rename_map = {
     "latest_seen": "Last Seen",
 }
 
-# Only rename columns that exist
-display_pandas = display_pandas.rename(
-    columns={k: v for k, v in column_rename_map.items() if k in display_pandas.columns}
-)
-
 # Round numeric columns for display
-if "Latitude" in display_pandas.columns:
-    display_pandas["Latitude"] = display_pandas["Latitude"].round(6)
-if "Longitude" in display_pandas.columns:
-    display_pandas["Longitude"] = display_pandas["Longitude"].round(6)
-if "Avg Duration (min)" in display_pandas.columns:
-    display_pandas["Avg Duration (min)"] = display_pandas["Avg Duration (min)"].round(1)
-if "Electric Checkout (%)" in display_pandas.columns:
-    display_pandas["Electric Checkout (%)"] = display_pandas["Electric Checkout (%)"].round(1)
-if "Electric Return (%)" in display_pandas.columns:
-    display_pandas["Electric Return (%)"] = display_pandas["Electric Return (%)"].round(1)
+round_digits = {
+    "lat": 6,
+    "lng": 6,
+    "avg_duration_min": 1,
+    "pct_checkouts_electric": 1,
+    "pct_returns_electric": 1,
+}
+
+# Stay in Polars: st.dataframe takes the Arrow table directly, no pandas copy
+display_df = station_table_sorted.select(
+    [
+        pl.col(c).round(round_digits[c]) if c in round_digits else pl.col(c)
+        for c in display_col_names
+    ]
+).rename({k: v for k, v in column_rename_map.items() if k in display_col_names})
 
 # Display using st.dataframe with column configuration
-display_pandas.index += 1
 st.dataframe(
-    display_pandas,
+    display_df,
     width='stretch',
     height=600,
     column_config={
@@ -510,7 +556,10 @@ st.dataframe(
 # --------------------------------------------------
 st.markdown("---")
 
-csv = display_pandas.to_csv(index=False).encode("utf-8")
+# Polars' CSV writer emits UTF-8 bytes straight into the buffer
+csv_buf = io.BytesIO()
+display_df.write_csv(csv_buf)
+csv = csv_buf.getvalue()
 st.download_button(
     label="📥 Download Table as CSV",
     data=csv,
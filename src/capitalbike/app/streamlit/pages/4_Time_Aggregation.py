@@ -1,3 +1,4 @@
+import io
 import sys
 from pathlib import Path
 
@@ -108,28 +109,46 @@ metric_map = {
 # --------------------------------------------------
 # Filter and Aggregate Data
 # --------------------------------------------------
-# Filter by aggregation level and filters
-filtered_df = time_df.filter(
-    (pl.col("agg_level") == agg_level_map[agg_level]) &
-    pl.col("member_type").is_in(member_filter) &
-    pl.col("rideable_type").is_in(rideable_filter)
-)
+@st.cache_data(ttl=3600, show_spinner=False)
+def compute_summary(
+    agg_level_key: str, member_filter: tuple[str, ...], rideable_filter: tuple[str, ...]
+) -> pl.DataFrame:
+    """
+    Filter time_aggregated to one level and roll it up across member/bike types.
+
+    The (level x member x bike type) space is small, so each combination is
+    aggregated once and then served from cache on later reruns.
+    """
+    # Filter by aggregation level and filters
+    filtered_df = load_time_aggregated().filter(
+        (pl.col("agg_level") == agg_level_key) &
+        pl.col("member_type").is_in(list(member_filter)) &
+        pl.col("rideable_type").is_in(list(rideable_filter))
+    )
 
-# Aggregate across member/bike types
-summary_df = (
-    filtered_df.group_by(["agg_value", "agg_sort_key"])
-    .agg([
-        pl.sum("total_checkouts").alias("checkouts"),
-        pl.sum("total_returns").alias("returns"),
-        pl.sum("net_flow").alias("net_flow"),
-        pl.mean("avg_duration_sec").alias("avg_duration_sec"),
-        pl.sum("total_trips").alias("total_trips"),
-    ])
-    .with_columns([
-        (pl.col("avg_duration_sec") / 60).alias("avg_duration_min"),
-    ])
-    .sort("agg_sort_key")
+    # Aggregate across member/bike types
+    return (
+        filtered_df.group_by(["agg_value", "agg_sort_key"])
+        .agg([
+            pl.sum("total_checkouts").alias("checkouts"),
+            pl.sum("total_returns").alias("returns"),
+            pl.sum("net_flow").alias("net_flow"),
+            pl.mean("avg_duration_sec").alias("avg_duration_sec"),
+            pl.sum("total_trips").alias("total_trips"),
+        ])
+        .with_columns([
+            (pl.col("avg_duration_sec") / 60).alias("avg_duration_min"),
+        ])
+        .sort("agg_sort_key")
+    )
+
+
+summary_df = compute_summary(
+    agg_level_map[agg_level],
+    tuple(sorted(member_filter)),
+    tuple(sorted(rideable_filter)),
 )
+n_rows = summary_df.height
 
 # --------------------------------------------------
 # Display Summary Metrics
@@ -172,17 +191,15 @@ with col4:
 st.markdown("---")
 st.subheader(f"Trends by {agg_level}")
 
-if len(summary_df) > 0:
-    # Convert to pandas for Plotly
-    summary_pandas = summary_df.to_pandas()
-
+if n_rows > 0:
+    # Plotly (>=6) consumes Polars frames natively, no pandas conversion needed
     viz_metric_col = metric_map[viz_metric]
 
     # Choose chart type based on aggregation level
     if agg_level in ["Day of Week", "Month"]:
         # Bar chart for categorical aggregations
         fig = px.bar(
-            summary_pandas,
+            summary_df,
             x="agg_value",
             y=viz_metric_col,
             title=f"{viz_metric} by {agg_level}",
@@ -201,7 +218,7 @@ if len(summary_df) > 0:
     else:
         # Line chart for time-based aggregations (Day, Year)
         fig = px.line(
-            summary_pandas,
+            summary_df,
             x="agg_value",
             y=viz_metric_col,
             title=f"{viz_metric} over Time ({agg_level})",
@@ -228,7 +245,7 @@ else:
 # --------------------------------------------------
 # Multi-Metric Comparison (for Day of Week and Month)
 # --------------------------------------------------
-if agg_level in ["Day of Week", "Month"] and len(summary_df) > 0:
+if agg_level in ["Day of Week", "Month"] and n_rows > 0:
     st.markdown("---")
     st.subheader("Multi-Metric Comparison")
 
@@ -237,15 +254,15 @@ if agg_level in ["Day of Week", "Month"] and len(summary_df) > 0:
 
     fig_multi.add_trace(go.Bar(
         name="Checkouts",
-        x=summary_pandas["agg_value"],
-        y=summary_pandas["checkouts"],
+        x=summary_df["agg_value"],
+        y=summary_df["checkouts"],
         marker_color="#1f77b4",
     ))
 
     fig_multi.add_trace(go.Bar(
         name="Returns",
-        x=summary_pandas["agg_value"],
-        y=summary_pandas["returns"],
+        x=summary_df["agg_value"],
+        y=summary_df["returns"],
         marker_color="#ff7f0e",
     ))
 
@@ -272,7 +289,7 @@ if agg_level in ["Day of Week", "Month"] and len(summary_df) > 0:
 st.markdown("---")
 st.subheader("Data Table")
 
-if len(summary_df) > 0:
+if n_rows > 0:
     # Prepare display dataframe
     display_df = summary_df.select([
         pl.col("agg_value").alias(agg_level),
@@ -283,11 +300,9 @@ if len(summary_df) > 0:
         pl.col("avg_duration_min").round(1).alias("Avg Duration (min)"),
     ])
 
-    # Display table with column config
-    _display_pandas = display_df.to_pandas()
-    _display_pandas.index += 1
+    # Display table with column config (Polars frame passed straight through)
     st.dataframe(
-        _display_pandas,
+        display_df,
         use_container_width=True,
         column_config={
             agg_level: st.column_config.TextColumn(agg_level),
@@ -321,7 +336,9 @@ if len(summary_df) > 0:
     )
 
     # CSV Export
-    csv = display_df.to_pandas().to_csv(index=False)
+    csv_buf = io.BytesIO()
+    display_df.write_csv(csv_buf)
+    csv = csv_buf.getvalue()
     st.download_button(
         label="📥 Download as CSV",
         data=csv,
@@ -335,25 +352,22 @@ else:
 # --------------------------------------------------
 # Insights Section
 # --------------------------------------------------
-if len(summary_df) > 0:
+if n_rows > 0:
     st.markdown("---")
     st.subheader("📊 Key Insights")
 
     with st.expander("View Insights"):
-        # Calculate some basic insights
-        max_checkouts_row = summary_df.filter(
-            pl.col("checkouts") == pl.col("checkouts").max()
-        )
-
-        max_returns_row = summary_df.filter(
-            pl.col("returns") == pl.col("returns").max()
-        )
+        # Calculate some basic insights (single arg_max scan per metric)
+        max_checkouts_idx = summary_df["checkouts"].arg_max()
+        max_returns_idx = summary_df["returns"].arg_max()
 
-        if len(max_checkouts_row) > 0:
-            st.markdown(f"**Highest Checkout Activity:** {max_checkouts_row['agg_value'][0]} with {max_checkouts_row['checkouts'][0]:,} checkouts")
+        if max_checkouts_idx is not None:
+            max_checkouts_row = summary_df.row(max_checkouts_idx, named=True)
+            st.markdown(f"**Highest Checkout Activity:** {max_checkouts_row['agg_value']} with {max_checkouts_row['checkouts']:,} checkouts")
 
-        if len(max_returns_row) > 0:
-            st.markdown(f"**Highest Return Activity:** {max_returns_row['agg_value'][0]} with {max_returns_row['returns'][0]:,} returns")
+        if max_returns_idx is not None:
+            max_returns_row = summary_df.row(max_returns_idx, named=True)
+            st.markdown(f"**Highest Return Activity:** {max_returns_row['agg_value']} with {max_returns_row['returns']:,} returns")
 
         avg_duration = summary_df['avg_duration_min'].mean()
         st.markdown(f"**Average Trip Duration:** {avg_duration:.1f} minutes")
@@ -1,14 +1,23 @@
 from __future__ import annotations
 
 import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from io import BytesIO
+from pathlib import Path
 from typing import Set, Tuple
 
 import boto3
 import polars as pl
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 
 from src.capitalbike.data.transform import normalize_trip_schema
-from src.capitalbike.data.stations import build_station_dimension
+from src.capitalbike.data.stations import (
+    build_station_dimension,
+    merge_station_dimensions,
+)
 
 
 RAW_BUCKET = os.getenv("S3_BUCKET_RAW", "capital-bikeshare-public")
@@ -18,12 +27,41 @@ PROC_BUCKET = os.getenv("S3_BUCKET_PROCESSED", "capital-bikeshare-manipulated")
 MASTER_PREFIX = os.getenv("S3_PREFIX_MASTER", "master/trips")  # partitioned target
 STATIONS_KEY = os.getenv("S3_KEY_STATIONS", "dimensions/stations.parquet")
 
+# Monthly raw files are processed in parallel. Yearly bulk files are
+# processed one at a time since each is held in memory (multi-GB) while
+# its monthly partitions upload
+FILE_WORKERS = int(os.getenv("INGEST_FILE_WORKERS", "4"))
+# Monthly partitions of a yearly bulk file are uploaded in parallel
+UPLOAD_WORKERS = int(os.getenv("INGEST_UPLOAD_WORKERS", "12"))
+_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=4,
+    use_threads=True,
+)
+
 
 # --------------------------------------------------
 # S3 helpers
 # --------------------------------------------------
+_S3_CLIENT = None
+
+
 def _s3() -> boto3.client:
-    return boto3.client("s3")
+    # One shared client so uploads reuse its connection pool; sized for the
+    # busiest phase (one connection per multipart thread of every concurrent
+    # upload) so parallel partition writes don't queue for sockets
+    global _S3_CLIENT
+    if _S3_CLIENT is None:
+        _S3_CLIENT = boto3.client(
+            "s3",
+            config=Config(
+                max_pool_connections=max(FILE_WORKERS, UPLOAD_WORKERS)
+                * _TRANSFER_CONFIG.max_concurrency,
+                retries={"max_attempts": 5, "mode": "adaptive"},
+            ),
+        )
+    return _S3_CLIENT
 
 
 def _parse_s3_uri(uri: str) -> Tuple[str, str]:
@@ -34,170 +72,332 @@ def _parse_s3_uri(uri: str) -> Tuple[str, str]:
     return bucket, key
 
 
-def _write_parquet_to_s3(df: pl.DataFrame, s3_uri: str) -> None:
+def _write_parquet_to_s3(
+    df: pl.DataFrame, s3_uri: str, compression: str = "zstd"
+) -> None:
     bucket, key = _parse_s3_uri(s3_uri)
     buf = BytesIO()
-    df.write_parquet(buf)
+    # zstd(3) shrinks what every later full-history scan has to download;
+    # statistics + large row groups help predicate pushdown on reads
+    df.write_parquet(
+        buf,
+        compression=compression,
+        compression_level=3,
+        statistics=True,
+        row_group_size=512_000,
+    )
     buf.seek(0)
-    _s3().put_object(Bucket=bucket, Key=key, Body=buf.getvalue())
+    _s3().upload_fileobj(buf, bucket, key, Config=_TRANSFER_CONFIG)
+
+
+def _sink_parquet_to_s3(lf: pl.LazyFrame, s3_uri: str) -> int:
+    """
+    Stream a LazyFrame to S3 via a local temp file and return its row count.
+
+    sink_parquet runs the plan on the streaming engine and writes record
+    batches as they are produced, so the frame is never fully materialized.
+    (The pinned Polars can only sink to local paths, hence the temp file.)
+    """
+    bucket, key = _parse_s3_uri(s3_uri)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "part.parquet")
+        lf.sink_parquet(
+            path,
+            compression="zstd",
+            compression_level=3,
+            statistics=True,
+            row_group_size=512_000,
+        )
+        rows = pl.scan_parquet(path).select(pl.len()).collect().item()
+        _s3().upload_file(path, bucket, key, Config=_TRANSFER_CONFIG)
+    return rows
 
 
 def _list_keys(bucket: str, prefix: str) -> list[str]:
-    s3 = _s3()
+    paginator = _s3().get_paginator("list_objects_v2")
     keys: list[str] = []
-    token = None
-    while True:
-        kwargs = {"Bucket": bucket, "Prefix": prefix}
-        if token:
-            kwargs["ContinuationToken"] = token
-        resp = s3.list_objects_v2(**kwargs)
-        for obj in resp.get("Contents", []):
-            keys.append(obj["Key"])
-        if resp.get("IsTruncated"):
-            token = resp.get("NextContinuationToken")
-        else:
-            break
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        keys.extend(obj["Key"] for obj in page.get("Contents", []))
     return keys
 
 
+def _list_common_prefixes(bucket: str, prefix: str) -> list[str]:
+    """List the "directories" directly under prefix (Delimiter="/")."""
+    paginator = _s3().get_paginator("list_objects_v2")
+    prefixes: list[str] = []
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix, Delimiter="/"):
+        prefixes.extend(cp["Prefix"] for cp in page.get("CommonPrefixes", []))
+    return prefixes
+
+
 def _existing_master_partitions() -> Set[Tuple[int, int]]:
     """Return {(year, month)} already written under MASTER_PREFIX."""
-    prefix = f"{MASTER_PREFIX}/"
-    keys = _list_keys(PROC_BUCKET, prefix)
-    parts: Set[Tuple[int, int]] = set()
+    # Only directory names are listed: the year=YYYY/ prefixes first, then
+    # each year's month=MM/ prefixes concurrently. Leaf files are never listed.
+    year_prefixes = _list_common_prefixes(PROC_BUCKET, f"{MASTER_PREFIX}/")
 
-    for k in keys:
-        # master/trips/year=2024/month=12/part.parquet
-        if "year=" in k and "month=" in k and k.endswith(".parquet"):
-            try:
-                year = int(k.split("year=")[1].split("/")[0])
-                month = int(k.split("month=")[1].split("/")[0])
-                parts.add((year, month))
-            except Exception:
-                continue
+    parts: Set[Tuple[int, int]] = set()
+    if not year_prefixes:
+        return parts
+
+    def _month_prefixes(year_prefix: str) -> list[str]:
+        return _list_common_prefixes(PROC_BUCKET, year_prefix)
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        for month_prefixes in pool.map(_month_prefixes, year_prefixes):
+            for p in month_prefixes:
+                # master/trips/year=2024/month=12/
+                try:
+                    year = int(p.split("year=")[1].split("/")[0])
+                    month = int(p.split("month=")[1].split("/")[0])
+                    parts.add((year, month))
+                except Exception:
+                    continue
     return parts
 
 
+def load_stations() -> pl.DataFrame:
+    """
+    Read the station dimension, cached on local disk by its S3 ETag.
+
+    The dimension only changes when build_master_table rewrites it, so
+    repeat runs read the local copy after a single HEAD request.
+    """
+    head = _s3().head_object(Bucket=PROC_BUCKET, Key=STATIONS_KEY)
+    etag = head["ETag"].strip('"')
+    cache = Path(tempfile.gettempdir()) / f"stations-{etag}.parquet"
+
+    if not cache.exists():
+        tmp = cache.with_suffix(".part")
+        _s3().download_file(PROC_BUCKET, STATIONS_KEY, str(tmp))
+        tmp.replace(cache)
+
+    return pl.read_parquet(cache)
+
+
 # --------------------------------------------------
-# Public API
+# Per-file processing
 # --------------------------------------------------
-def build_master_table(stations: pl.DataFrame, missing_months: bool = True) -> None:
-    """
-    Build (or update) the partitioned master trips table and station dimension.
+# YYYY (bulk) or YYYYMM (monthly) raw files, at any depth
+_RAW_KEY_RE = re.compile(r"(?:^|/)(\d{4}|\d{6})\.(?:csv|parquet)$")
 
-    Handles:
-    - Monthly files: YYYYMM.(csv|parquet)
-    - Yearly bulk files: YYYY.(parquet)
 
-    All data are written as monthly partitions:
-      master/trips/year=YYYY/month=MM/part.parquet
+def _key_kind(key: str) -> tuple[str, int | None, int | None]:
     """
+    Classify a raw key by its filename.
 
-    raw_keys = [
-        k
-        for k in _list_keys(RAW_BUCKET, RAW_PREFIX)
-        if k.endswith((".csv", ".parquet"))
-    ]
+    Returns:
+      ("monthly", year, month)
+      ("bulk", year, None)
+      ("ignore", None, None)
+    """
+    m = _RAW_KEY_RE.search(key)
+    if not m:
+        return "ignore", None, None
 
-    # --------------------------------------------
-    # Determine file type from filename
-    # --------------------------------------------
-    def _key_kind(key: str) -> tuple[str, int | None, int | None]:
-        """
-        Returns:
-          ("monthly", year, month)
-          ("bulk", year, None)
-          ("ignore", None, None)
-        """
-        name = key.split("/")[-1]
-        stem = name.replace(".csv", "").replace(".parquet", "")
-
-        if stem.isdigit() and len(stem) == 6:
-            return "monthly", int(stem[:4]), int(stem[4:6])
-
-        if stem.isdigit() and len(stem) == 4:
-            return "bulk", int(stem), None
+    stem = m.group(1)
+    if len(stem) == 6:
+        return "monthly", int(stem[:4]), int(stem[4:])
+    return "bulk", int(stem), None
 
-        return "ignore", None, None
 
-    already = _existing_master_partitions() if missing_months else set()
+def _process_raw_key(
+    key: str, stations: pl.DataFrame, already: Set[Tuple[int, int]]
+) -> list[Tuple[int, int]]:
+    """
+    Normalize one raw file and write its monthly partition(s) to master.
 
-    # --------------------------------------------
-    # Process each raw file
-    # --------------------------------------------
-    for key in sorted(raw_keys):
-        kind, year, month = _key_kind(key)
+    Months in `already` are skipped (pass an empty set to rebuild everything).
 
-        if kind == "ignore":
-            continue
+    Returns:
+        The (year, month) partitions written
+    """
+    kind, year, month = _key_kind(key)
+
+    if kind == "ignore":
+        return []
+
+    if kind == "monthly" and (year, month) in already:
+        print(f"Skipping existing {year}-{month:02d}")
+        return []
+
+    if kind == "bulk" and all((year, m) in already for m in range(1, 13)):
+        print(f"Skipping bulk {year} (all months present)")
+        return []
+
+    s3_path = f"s3://{RAW_BUCKET}/{key}"
+    print(f"Processing {s3_path}")
+
+    # Parquet is scanned lazily and collected with the streaming engine,
+    # so a multi-GB yearly file is decoded in chunks instead of whole
+    lf_raw = (
+        pl.scan_parquet(
+            s3_path,
+            storage_options={
+                "aws_region": os.getenv("AWS_DEFAULT_REGION", "us-east-1"),
+            },
+        )
+        if key.endswith(".parquet")
+        else pl.read_csv(s3_path, ignore_errors=True).lazy()
+    )
 
-        s3_path = f"s3://{RAW_BUCKET}/{key}"
-        print(f"Processing {s3_path}")
+    lf = normalize_trip_schema(lf_raw, stations)
 
-        df_raw = (
-            pl.read_parquet(s3_path)
-            if key.endswith(".parquet")
-            else pl.read_csv(s3_path, ignore_errors=True)
+    # ----------------------------------------
+    # Monthly file (YYYYMM)
+    # ----------------------------------------
+    if kind == "monthly":
+        out_uri = (
+            f"s3://{PROC_BUCKET}/{MASTER_PREFIX}/"
+            f"year={year}/month={month}/part.parquet"
         )
 
-        df = normalize_trip_schema(df_raw, stations)
-
-        # ----------------------------------------
-        # Monthly file (YYYYMM)
-        # ----------------------------------------
-        if kind == "monthly":
-            if missing_months and (year, month) in already:
-                print(f"Skipping existing {year}-{month:02d}")
-                continue
-
-            out_uri = (
-                f"s3://{PROC_BUCKET}/{MASTER_PREFIX}/"
-                f"year={year}/month={month}/part.parquet"
-            )
-
-            _write_parquet_to_s3(df, out_uri)
-            print(f"Wrote {out_uri} (rows={df.height:,})")
-
-        # ----------------------------------------
-        # Yearly bulk file (YYYY) → split by month
-        # ----------------------------------------
-        else:  # kind == "bulk"
-            df = df.with_columns(
-                [
-                    pl.col("started_at").dt.year().alias("_year"),
-                    pl.col("started_at").dt.month().alias("_month"),
-                ]
-            )
-
-            partitions = df.partition_by(["_year", "_month"], as_dict=True)
+        rows = _sink_parquet_to_s3(lf, out_uri)
+        print(f"Wrote {out_uri} (rows={rows:,})")
+        return [(year, month)]
+
+    # ----------------------------------------
+    # Yearly bulk file (YYYY) → split by month
+    # ----------------------------------------
+    else:  # kind == "bulk"
+        lf = lf.with_columns(
+            [
+                pl.col("started_at").dt.year().alias("_year"),
+                pl.col("started_at").dt.month().alias("_month"),
+            ]
+        )
 
-            for (y, m), subdf in sorted(partitions.items()):
-                if missing_months and (y, m) in already:
-                    print(f"Skipping existing {y}-{m:02d}")
-                    continue
+        # Drop months already in master before they are materialized.
+        # One (year == y & month in [...]) term per year keeps this to
+        # plain integer compares instead of hashing a derived key per row.
+        if already:
+            done_expr = pl.lit(False)
+            for y in sorted({yy for yy, _ in already}):
+                done_months = sorted(mm for yy, mm in already if yy == y)
+                done_expr = done_expr | (
+                    (pl.col("_year") == y) & pl.col("_month").is_in(done_months)
+                )
+            lf = lf.filter(~done_expr)
 
+        df = lf.collect(streaming=True)
+        partitions = df.partition_by(["_year", "_month"], as_dict=True)
+
+        # Uploads are network-bound, so write the months concurrently
+        with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as pool:
+            futures = {}
+            for (y, m), subdf in sorted(partitions.items()):
                 out_uri = (
                     f"s3://{PROC_BUCKET}/{MASTER_PREFIX}/"
                     f"year={y}/month={m}/part.parquet"
                 )
 
-                _write_parquet_to_s3(
+                future = pool.submit(
+                    _write_parquet_to_s3,
                     subdf.drop(["_year", "_month"]),
                     out_uri,
                 )
+                futures[future] = (out_uri, subdf.height)
 
-                print(f"Wrote {out_uri} (rows={subdf.height:,})")
+            for future in as_completed(futures):
+                future.result()
+                out_uri, rows = futures[future]
+                print(f"Wrote {out_uri} (rows={rows:,})")
+
+        return sorted(partitions)
+
+
+# --------------------------------------------------
+# Public API
+# --------------------------------------------------
+def build_master_table(stations: pl.DataFrame, missing_months: bool = True) -> None:
+    """
+    Build (or update) the partitioned master trips table and station dimension.
+
+    Handles:
+    - Monthly files: YYYYMM.(csv|parquet)
+    - Yearly bulk files: YYYY.(parquet)
+
+    All data are written as monthly partitions:
+      master/trips/year=YYYY/month=MM/part.parquet
+    """
+
+    raw_keys = [k for k in _list_keys(RAW_BUCKET, RAW_PREFIX) if _RAW_KEY_RE.search(k)]
+
+    already = _existing_master_partitions() if missing_months else set()
+
+    # --------------------------------------------
+    # Yearly bulk files go one at a time: each is collected in full and
+    # already fans its month uploads out over UPLOAD_WORKERS threads
+    # --------------------------------------------
+    bulk_keys = sorted(k for k in raw_keys if _key_kind(k)[0] == "bulk")
+    written: list[Tuple[int, int]] = []
+    for key in bulk_keys:
+        written.extend(_process_raw_key(key, stations, already))
+
+    # --------------------------------------------
+    # Process the remaining raw files concurrently (each is S3 download ->
+    # normalize -> S3 upload, independent of the others)
+    # --------------------------------------------
+    with ThreadPoolExecutor(max_workers=FILE_WORKERS) as pool:
+        futures = [
+            pool.submit(_process_raw_key, key, stations, already)
+            for key in sorted(set(raw_keys) - set(bulk_keys))
+        ]
+        for future in as_completed(futures):
+            written.extend(future.result())
 
     # --------------------------------------------
     # Rebuild stations from authoritative master
     # --------------------------------------------
-    print("Rebuilding station dimension from master trips...")
+    station_cols = [
+        "start_station_id",
+        "end_station_id",
+        "start_station_name",
+        "end_station_name",
+        "start_lat",
+        "end_lat",
+        "start_lng",
+        "end_lng",
+        "started_at",
+    ]
+    storage_options = {"aws_region": os.getenv("AWS_DEFAULT_REGION", "us-east-1")}
 
-    trips_lf = pl.scan_parquet(
-        f"s3://{PROC_BUCKET}/{MASTER_PREFIX}/year=*/month=*/part.parquet"
+    incremental = (
+        missing_months and stations.height > 0 and "latest_seen" in stations.columns
     )
 
-    stations_new = build_station_dimension(trips_lf)
+    if incremental and not written:
+        print("No new partitions; station dimension unchanged")
+        return
+
+    if incremental:
+        # Append run: only the partitions written above are scanned, and the
+        # result is folded into the existing dimension
+        print(f"Updating station dimension from {len(written)} new partition(s)...")
+
+        new_lf = pl.scan_parquet(
+            [
+                f"s3://{PROC_BUCKET}/{MASTER_PREFIX}/year={y}/month={m}/part.parquet"
+                for y, m in sorted(written)
+            ],
+            storage_options=storage_options,
+        ).select(station_cols)
+
+        stations_new = merge_station_dimensions(
+            stations, build_station_dimension(new_lf)
+        )
+    else:
+        print("Rebuilding station dimension from master trips...")
+
+        # Only the station columns are read from each file; year/month come
+        # from the partition path rather than the file contents
+        trips_lf = pl.scan_parquet(
+            f"s3://{PROC_BUCKET}/{MASTER_PREFIX}/year=*/month=*/part.parquet",
+            hive_partitioning=True,
+            storage_options=storage_options,
+        ).select(station_cols)
+
+        stations_new = build_station_dimension(trips_lf)
 
     _write_parquet_to_s3(
         stations_new,
@@ -212,10 +412,7 @@ if __name__ == "__main__":
     # Falls back to an empty frame on first run (coordinates will be null until
     # the station dimension is rebuilt at the end of build_master_table).
     try:
-        buf = BytesIO()
-        _s3().download_fileobj(PROC_BUCKET, STATIONS_KEY, buf)
-        buf.seek(0)
-        stations = pl.read_parquet(buf)
+        stations = load_stations()
     except Exception:
         stations = pl.DataFrame(
             schema={
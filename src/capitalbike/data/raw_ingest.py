@@ -1,12 +1,18 @@
 from __future__ import annotations
 
-import calendar
-from datetime import datetime, timedelta
+import functools
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from io import BytesIO
+from typing import BinaryIO
 import zipfile
 
 import boto3
 import pandas as pd
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 import requests
 
 
@@ -16,18 +22,58 @@ DEFAULT_RAW_BUCKET = "capital-bikeshare-raw"
 DEFAULT_RAW_PREFIX = "raw_monthly_parquet"
 
 
+BACKFILL_WORKERS = 8
+
+# Monthly files above the threshold go up as parallel multipart parts
+_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=4,
+)
+
+
+@functools.lru_cache(maxsize=1)
 def _s3() -> boto3.client:
-    return boto3.client("s3")
+    # One client shared by every backfill worker (clients are thread-safe).
+    # Built from its own session since the default session is not, and
+    # pooled wide enough that parallel uploads don't wait for a connection.
+    return boto3.session.Session().client(
+        "s3",
+        config=Config(
+            max_pool_connections=64,
+            retries={"max_attempts": 10, "mode": "adaptive"},
+        ),
+    )
+
+
+def _month_range(start_from: str, end: datetime) -> list[str]:
+    """YYYYMM strings from start_from through end's month, inclusive."""
+    dt = datetime.strptime(start_from, "%Y%m")
+    year, month = dt.year, dt.month
+    months = []
+    while (year, month) <= (end.year, end.month):
+        months.append(f"{year}{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
 
 
-def download_month_zip(year_month: str) -> BytesIO:
+def download_month_zip(year_month: str) -> BinaryIO:
+    """
+    Stream a month's zip into a spooled temp file.
+
+    Small zips stay in memory; anything over 64 MB spills to disk instead of
+    being held as one bytes object.
+    """
     url = f"{CABI_ZIP_BASE_URL}/{year_month}-capitalbikeshare-tripdata.zip"
-    resp = requests.get(url, timeout=120)
-    resp.raise_for_status()
-    return BytesIO(resp.content)
+    with requests.get(url, stream=True, timeout=120) as resp:
+        resp.raise_for_status()
+        buf = tempfile.SpooledTemporaryFile(max_size=64 * 1024 * 1024)
+        shutil.copyfileobj(resp.raw, buf)
+    buf.seek(0)
+    return buf
 
 
-def extract_first_csv_from_zip(zip_buf: BytesIO) -> BytesIO:
+def extract_first_csv_from_zip(zip_buf: BinaryIO) -> BytesIO:
     """
     Extract CSV data from ZIP file.
 
@@ -75,21 +121,19 @@ def write_month_parquet_to_s3(
     df = pd.read_csv(csv_buf)
 
     out = BytesIO()
-    df.to_parquet(out, index=False)
+    df.to_parquet(out, index=False, compression="zstd")
     out.seek(0)
 
     key = month_to_key(year_month)
-    _s3().put_object(Bucket=bucket, Key=key, Body=out.getvalue())
+    # Stream the buffer itself; getvalue() would copy the whole file first
+    _s3().upload_fileobj(out, bucket, key, Config=_TRANSFER_CONFIG)
     print(f"Wrote s3://{bucket}/{key} (rows={len(df):,})")
 
 
 def backfill_from(start_from: str, bucket: str = DEFAULT_RAW_BUCKET) -> None:
-    dt = datetime.strptime(start_from, "%Y%m")
-    today = datetime.now()
-
-    while dt.year < today.year or (dt.year == today.year and dt.month <= today.month):
-        ym = dt.strftime("%Y%m")
-        write_month_parquet_to_s3(ym, bucket=bucket)
+    """Download and write every month from start_from (YYYYMM) through today."""
+    months = _month_range(start_from, datetime.now())
 
-        days_in_month = calendar.monthrange(dt.year, dt.month)[1]
-        dt = dt + timedelta(days=days_in_month)
+    # Months are independent and network-bound: download/convert/upload in parallel
+    with ThreadPoolExecutor(max_workers=BACKFILL_WORKERS) as pool:
+        list(pool.map(lambda ym: write_month_parquet_to_s3(ym, bucket=bucket), months))
@@ -5,6 +5,44 @@ import polars as pl
 from src.capitalbike.data.transform import normalize_station_id
 
 
+def _collapse_by_station_id(lf: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Reduce (station_id, station_name, ...) rows to one row per station_id.
+
+    Renamed stations collapse in a single hash pass: name/coords come from
+    the most recently seen row, seen-dates span all of them. earliest_seen is
+    therefore the first time the station ID appeared under any name, not
+    when its current name first appeared (the dimension used that meaning
+    before renamed rows were collapsed this way). Taking the min is what
+    keeps merge_station_dimensions equal to a full rebuild. The derived
+    first_seen_str/status columns are (re)computed on the result.
+    """
+    return (
+        lf.group_by("station_id")
+        .agg(
+            [
+                pl.col("station_name").sort_by("latest_seen").last(),
+                pl.col("lat").sort_by("latest_seen").last(),
+                pl.col("lng").sort_by("latest_seen").last(),
+                pl.col("earliest_seen").min(),
+                pl.col("latest_seen").max(),
+            ]
+        )
+        .with_columns(
+            [
+                pl.col("earliest_seen").dt.strftime("%Y-%m-%d").alias("first_seen_str"),
+                pl.when(
+                    pl.col("latest_seen")
+                    >= pl.col("latest_seen").max() - pl.duration(days=30)
+                )
+                .then(pl.lit("active"))
+                .otherwise(pl.col("latest_seen").dt.strftime("%Y-%m-%d"))
+                .alias("status"),
+            ]
+        )
+    )
+
+
 def build_station_dimension(trips: pl.LazyFrame | pl.DataFrame) -> pl.DataFrame:
     """
     Build ONE canonical station dimension table.
@@ -14,46 +52,55 @@ def build_station_dimension(trips: pl.LazyFrame | pl.DataFrame) -> pl.DataFrame:
       station_name      Utf8
       lat               Float64
       lng               Float64
-      earliest_seen     Datetime
+      earliest_seen     Datetime (first seen under any of its names)
       latest_seen       Datetime
+      first_seen_str    Utf8   (earliest_seen as YYYY-MM-DD)
+      status            Utf8   ("active", or the YYYY-MM-DD it was last seen)
+
+    A station is "active" if it was seen within 30 days of the latest
+    observation in the data.
 
     Stations are entities; start/end are roles.
-    We union start+end observations then aggregate.
+    We union start+end observations (in a single pass) then aggregate.
     """
     lf = trips.lazy() if isinstance(trips, pl.DataFrame) else trips
+    schema = lf.schema
 
-    lf = lf.with_columns(
-        [
-            normalize_station_id(pl.col("start_station_id")).alias("start_station_id"),
-            normalize_station_id(pl.col("end_station_id")).alias("end_station_id"),
-            pl.col("started_at").cast(pl.Datetime),
-        ]
-    )
-
-    start_obs = lf.select(
-        [
-            pl.col("start_station_id").alias("station_id"),
-            pl.col("start_station_name").alias("station_name"),
-            pl.col("start_lat").alias("lat"),
-            pl.col("start_lng").alias("lng"),
-            pl.col("started_at").alias("seen_at"),
-        ]
-    )
-
-    end_obs = lf.select(
-        [
-            pl.col("end_station_id").alias("station_id"),
-            pl.col("end_station_name").alias("station_name"),
-            pl.col("end_lat").alias("lat"),
-            pl.col("end_lng").alias("lng"),
-            pl.col("started_at").alias("seen_at"),
-        ]
+    # One projection yields both roles: each column pairs the start and end
+    # observation of a trip in a 2-element list, then all lists are exploded
+    # together (one scan of lf instead of two selects + concat). ID
+    # normalization and the datetime cast happen inside the projection, and
+    # null IDs are dropped straight after the explode, so only the five
+    # typed columns of valid observations reach the group_by.
+    obs = (
+        lf.select(
+            [
+                pl.concat_list(
+                    [
+                        normalize_station_id(
+                            pl.col("start_station_id"), schema["start_station_id"]
+                        ),
+                        normalize_station_id(
+                            pl.col("end_station_id"), schema["end_station_id"]
+                        ),
+                    ]
+                ).alias("station_id"),
+                pl.concat_list(["start_station_name", "end_station_name"]).alias(
+                    "station_name"
+                ),
+                pl.concat_list(["start_lat", "end_lat"]).alias("lat"),
+                pl.concat_list(["start_lng", "end_lng"]).alias("lng"),
+                pl.concat_list([pl.col("started_at").cast(pl.Datetime)] * 2).alias(
+                    "seen_at"
+                ),
+            ]
+        )
+        .explode(["station_id", "station_name", "lat", "lng", "seen_at"])
+        .filter(pl.col("station_id").is_not_null())
     )
 
     stations = (
-        pl.concat([start_obs, end_obs], how="vertical")
-        .filter(pl.col("station_id").is_not_null())
-        .group_by(["station_id", "station_name"])
+        obs.group_by(["station_id", "station_name"])
         .agg(
             [
                 pl.col("lat").mean().cast(pl.Float64).alias("lat"),
@@ -62,9 +109,7 @@ def build_station_dimension(trips: pl.LazyFrame | pl.DataFrame) -> pl.DataFrame:
                 pl.col("seen_at").max().alias("latest_seen"),
             ]
         )
-        .sort("station_id")
-        .sort("latest_seen", descending=True)
-        .unique(subset="station_id", keep="first")
+        .pipe(_collapse_by_station_id)
         .collect()
     )
 
@@ -72,3 +117,35 @@ def build_station_dimension(trips: pl.LazyFrame | pl.DataFrame) -> pl.DataFrame:
     assert stations["station_id"].dtype == pl.Int64
 
     return stations
+
+
+def merge_station_dimensions(old: pl.DataFrame, new: pl.DataFrame) -> pl.DataFrame:
+    """
+    Fold a dimension built from newly written partitions into an existing one.
+
+    Seen-dates are re-min/maxed across both and the name/coords of the most
+    recently seen row win, exactly as a full rebuild would. Extra columns on
+    the old dimension (e.g. geocoded city/state/zip_code) are carried over.
+    """
+    core = ["station_id", "station_name", "lat", "lng", "earliest_seen", "latest_seen"]
+    extra = [
+        c
+        for c in old.columns
+        if c not in core and c not in ("first_seen_str", "status")
+    ]
+
+    merged = (
+        pl.concat(
+            [old.lazy().select(core), new.lazy().select(core)],
+            how="vertical_relaxed",
+        )
+        .pipe(_collapse_by_station_id)
+        .collect()
+    )
+
+    if extra:
+        merged = merged.join(
+            old.select(["station_id"] + extra), on="station_id", how="left"
+        )
+
+    return merged
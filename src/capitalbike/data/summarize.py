@@ -1,12 +1,16 @@
 from __future__ import annotations
 
+import functools
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from io import BytesIO
 from typing import Tuple
 
 import boto3
 import polars as pl
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -19,14 +23,39 @@ logger = logging.getLogger(__name__)
 PROC_BUCKET = os.getenv("S3_BUCKET_PROCESSED", "capital-bikeshare-manipulated")
 MASTER_PREFIX = os.getenv("S3_PREFIX_MASTER", "master/trips")
 STATIONS_KEY = os.getenv("S3_KEY_STATIONS", "dimensions/stations.parquet")
+FACETS_KEY = os.getenv("S3_KEY_STATION_FACETS", "dimensions/stations_facets.parquet")
 AGG_PREFIX = os.getenv("S3_PREFIX_AGG", "aggregates")
 
+# Builders share one in-memory trips frame and mostly wait on S3, so a few
+# run side by side; each holds its own group-by state in memory
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "4"))
+
+# Large aggregates (station_hourly, station_daily_detailed) go up as
+# parallel multipart uploads; small ones fall back to a single PUT
+_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=8,
+    use_threads=True,
+)
+
 
 # --------------------------------------------------
 # S3 helpers
 # --------------------------------------------------
+@functools.lru_cache(maxsize=1)
 def _s3() -> boto3.client:
-    return boto3.client("s3")
+    # One client shared by the builder threads (clients are thread-safe,
+    # creating them from the default session is not), with a connection pool
+    # wide enough for every builder's multipart parts at once
+    return boto3.session.Session().client(
+        "s3",
+        config=Config(
+            max_pool_connections=SUMMARY_WORKERS * _TRANSFER_CONFIG.max_concurrency,
+            retries={"max_attempts": 5, "mode": "adaptive"},
+            tcp_keepalive=True,
+        ),
+    )
 
 
 def _parse_s3_uri(uri: str) -> Tuple[str, str]:
@@ -37,25 +66,143 @@ def _parse_s3_uri(uri: str) -> Tuple[str, str]:
     return bucket, key
 
 
-def _write_parquet_to_s3(df: pl.DataFrame, s3_uri: str) -> None:
+# Narrow output types for the aggregate columns: counts fit in Int32, and
+# Float32 keeps durations to well under a second and coordinates to ~1 m
+_OUTPUT_DTYPES = {
+    "trips": pl.Int32,
+    "trip_count": pl.Int32,
+    "total_trips": pl.Int32,
+    "total_checkouts": pl.Int32,
+    "total_returns": pl.Int32,
+    "num_checkouts": pl.Int32,
+    "num_returns": pl.Int32,
+    "net_flow": pl.Int32,
+    "distinct_bikes_out": pl.Int32,
+    "avg_duration_sec": pl.Float32,
+    "avg_duration_checkout_sec": pl.Float32,
+    "avg_duration_return_sec": pl.Float32,
+    "lat": pl.Float32,
+    "lng": pl.Float32,
+    "start_lat": pl.Float32,
+    "start_lng": pl.Float32,
+    "end_lat": pl.Float32,
+    "end_lng": pl.Float32,
+}
+
+
+def _write_parquet_to_s3(
+    df: pl.DataFrame, s3_uri: str, row_group_size: int = 128_000
+) -> None:
     bucket, key = _parse_s3_uri(s3_uri)
+    df = df.with_columns(
+        [pl.col(c).cast(t) for c, t in _OUTPUT_DTYPES.items() if c in df.columns]
+    )
     buf = BytesIO()
-    df.write_parquet(buf)
+    # Column min/max statistics let readers skip row groups on filtered scans;
+    # smaller row groups make those skips finer-grained on sorted outputs
+    df.write_parquet(
+        buf,
+        compression="zstd",
+        compression_level=3,
+        statistics=True,
+        row_group_size=row_group_size,
+    )
     buf.seek(0)
-    _s3().put_object(Bucket=bucket, Key=key, Body=buf.getvalue())
+    _s3().upload_fileobj(buf, bucket, key, Config=_TRANSFER_CONFIG)
+
+
+def _write_partitioned_parquet_to_s3(df: pl.DataFrame, s3_prefix: str) -> None:
+    """
+    Write a frame with year/month columns as Hive partitions.
+
+    Mirrors the master trips layout:
+      <s3_prefix>/year=YYYY/month=MM/part.parquet
+
+    The partition columns are dropped from the file contents; readers get
+    them back from the path via hive partitioning.
+    """
+    partitions = df.partition_by(["year", "month"], as_dict=True)
+
+    for (y, m), part in sorted(partitions.items()):
+        _write_parquet_to_s3(
+            part.drop(["year", "month"]),
+            f"{s3_prefix}/year={y}/month={m}/part.parquet",
+        )
 
 
-def _trips_scan() -> pl.LazyFrame:
-    return pl.scan_parquet(
+def _trips_scan(columns: list[str] | None = None) -> pl.LazyFrame:
+    """
+    Lazily scan the master trips, optionally projected to `columns`.
+
+    year/month come from the partition path, so a filter on them prunes
+    whole partitions before any file is opened. The trip start date is
+    derived here, once, for every daily builder. Projecting up front keeps
+    the Parquet reader from fetching columns no aggregate uses.
+
+    The raw columns are selected before `date` is added: deriving it ahead
+    of the projection on a hive scan can drop it from the streaming plan.
+    """
+    trips = pl.scan_parquet(
         f"s3://{PROC_BUCKET}/{MASTER_PREFIX}/year=*/month=*/part.parquet",
+        hive_partitioning=True,
         storage_options={
             "aws_region": os.getenv("AWS_DEFAULT_REGION", "us-east-1"),
         }
     )
+    date = pl.col("started_at").dt.date().alias("date")
 
+    if columns is None:
+        return trips.with_columns(date)
 
-def _stations_scan() -> pl.LazyFrame:
-    return pl.scan_parquet(
+    raw = [c for c in columns if c != "date"]
+    if "date" in columns and "started_at" not in raw:
+        raw.append("started_at")
+
+    return trips.select(raw).with_columns(date).select(columns)
+
+
+# Every trip column any aggregate reads
+_TRIP_COLUMNS = [
+    "started_at",
+    "date",
+    "ended_at",
+    "duration_sec",
+    "start_station_id",
+    "end_station_id",
+    "bike_number",
+    "member_type",
+    "rideable_type",
+]
+
+
+def _trips_collect() -> pl.DataFrame:
+    """
+    Read the projected master trips into memory once.
+
+    Each aggregate builder accepts the result (as a LazyFrame) so a full
+    build_all_summaries run lists the partitions and decodes the Parquet
+    files once instead of once per table. Row filters stay in the builders
+    since they differ (e.g. routes and hourly keep non-positive durations).
+    The whole projection is materialized anyway, so the default engine is
+    used; streaming buys no memory here.
+    """
+    return _trips_scan(_TRIP_COLUMNS).collect()
+
+
+# Pre-2020 trips have no member/bike type; label them "unknown" so they
+# still form their own group in the detailed tables. Master partitions
+# written before ingest lowercased member_type still hold "Member"/"Casual".
+_FILL_UNKNOWN_TYPES = [
+    pl.col("member_type").str.to_lowercase().fill_null("unknown"),
+    pl.col("rideable_type").fill_null("unknown"),
+]
+
+
+@functools.lru_cache(maxsize=1)
+def _stations_df() -> pl.DataFrame:
+    # The station dimension is a few hundred rows; read it once per process
+    # rather than once per builder
+    return pl.read_parquet(
         f"s3://{PROC_BUCKET}/{STATIONS_KEY}",
         storage_options={
             "aws_region": os.getenv("AWS_DEFAULT_REGION", "us-east-1"),
@@ -63,25 +210,39 @@ def _stations_scan() -> pl.LazyFrame:
     )
 
 
+def _stations_scan() -> pl.LazyFrame:
+    return _stations_df().lazy()
+
+
 # --------------------------------------------------
 # Aggregates
 # --------------------------------------------------
-def build_system_daily() -> None:
-    trips = _trips_scan()
+def build_system_daily(detailed: pl.DataFrame | None = None) -> None:
+    """
+    Build system-wide daily trip counts and average duration.
+
+    Derived from the (date, member_type, rideable_type) detailed table rather
+    than a second trip scan: trips and duration sums add up across member and
+    bike types, so the daily mean is their ratio.
+
+    Args:
+        detailed: system_daily_detailed frame, if already built
+    """
+    if detailed is None:
+        detailed = _system_daily_detailed_frame()
 
     out = (
-        trips
-        .filter(pl.col("duration_sec") > 0)  # Filter out negative/zero durations
-        .with_columns(pl.col("started_at").dt.date().alias("date"))
-        .group_by("date")
+        detailed
+        .group_by("date", maintain_order=False)
         .agg(
             [
-                pl.len().alias("trips"),
-                pl.col("duration_sec").mean().alias("avg_duration_sec"),
+                pl.col("trips").sum().alias("trips"),
+                (
+                    pl.col("sum_duration_sec").sum() / pl.col("trips").sum()
+                ).alias("avg_duration_sec"),
             ]
         )
         .sort("date")
-        .collect()
     )
 
     out_uri = f"s3://{PROC_BUCKET}/{AGG_PREFIX}/system_daily.parquet"
@@ -89,43 +250,50 @@ def build_system_daily() -> None:
     logger.info(f"System_daily written to {out_uri}")
 
 
-def build_station_daily(sample: bool = False) -> None:
-    trips = _trips_scan()
+def _station_daily_frame(trips: pl.LazyFrame | None = None) -> pl.DataFrame:
+    """Aggregate checkouts and returns by (station_id, date) with station metadata."""
+    if trips is None:
+        trips = _trips_scan(
+            ["date", "duration_sec", "start_station_id", "end_station_id", "bike_number"]
+        )
     stations = _stations_scan()
 
-    # Aggregate checkouts (trips starting from this station)
-    checkouts = (
-        trips
-        .filter(pl.col("duration_sec") > 0)  # Filter out negative/zero durations
-        .with_columns(pl.col("started_at").dt.date().alias("date"))
-        .group_by(["start_station_id", "date"])
+    # Stack checkouts (trips starting here) and returns (trips ending here)
+    # into one event stream so both are counted in a single group-by. Only
+    # checkouts need duration and bike; the diagonal concat leaves them null
+    # on the return rows instead of carrying both columns for every trip.
+    events = pl.concat(
+        [
+            trips.filter(pl.col("duration_sec") > 0)  # Filter out negative/zero durations
+            .select(
+                [
+                    pl.col("start_station_id").alias("station_id"),
+                    "date",
+                    "duration_sec",
+                    "bike_number",
+                ]
+            )
+            .with_columns(pl.lit(True).alias("is_checkout")),
+            trips.select([pl.col("end_station_id").alias("station_id"), "date"])
+            .with_columns(pl.lit(False).alias("is_checkout")),
+        ],
+        how="diagonal",
+    )
+
+    is_checkout = pl.col("is_checkout")
+    base = (
+        events.group_by(["station_id", "date"], maintain_order=False)
         .agg(
             [
-                pl.len().alias("num_checkouts"),
-                pl.col("duration_sec").mean().alias("avg_duration_sec"),
-                pl.col("bike_number").n_unique().alias("distinct_bikes_out"),
+                is_checkout.sum().alias("num_checkouts"),
+                (~is_checkout).sum().alias("num_returns"),
+                pl.col("duration_sec").filter(is_checkout).mean().alias("avg_duration_sec"),
+                pl.col("bike_number").filter(is_checkout).n_unique().alias("distinct_bikes_out"),
             ]
         )
-        .rename({"start_station_id": "station_id"})
-    )
-
-    # Aggregate returns (trips ending at this station)
-    returns = (
-        trips.with_columns(pl.col("started_at").dt.date().alias("date"))
-        .group_by(["end_station_id", "date"])
-        .agg(pl.len().alias("num_returns"))
-        .rename({"end_station_id": "station_id"})
-    )
-
-    # Join checkouts and returns
-    base = checkouts.join(
-        returns, on=["station_id", "date"], how="full", coalesce=True
-    ).with_columns(
-        [
-            pl.col("num_checkouts").fill_null(0),
-            pl.col("num_returns").fill_null(0),
-            (pl.col("num_checkouts") - pl.col("num_returns")).alias("net_flow"),
-        ]
+        .with_columns(
+            (pl.col("num_checkouts").cast(pl.Int32) - pl.col("num_returns").cast(pl.Int32)).alias("net_flow"),
+        )
     )
 
     out = (
@@ -144,60 +312,100 @@ def build_station_daily(sample: bool = False) -> None:
                 "net_flow",
             ]
         )
-        .sort(["date", "station_id"])
-        .collect()
+        .collect(streaming=True)
     )
 
+    return out
+
+
+def build_station_daily(
+    sample: bool = False,
+    trips: pl.LazyFrame | None = None,
+    station_daily: pl.DataFrame | None = None,
+) -> pl.DataFrame:
+    """
+    Build station-level daily checkouts/returns, or a 200k-row sample of it.
+
+    Args:
+        sample: Write the station_daily_sample table instead of the full one
+        trips: Pre-loaded trips (see _trips_collect); scanned from S3 if omitted
+        station_daily: Already-aggregated frame (e.g. the return value of the
+            full build), so the sample is drawn without aggregating again
+
+    Returns:
+        The full aggregated frame
+    """
+    if station_daily is None:
+        station_daily = _station_daily_frame(trips)
+    out = station_daily
+
     if sample:
-        out = out.sample(n=min(200_000, out.height), seed=42)
+        out = out.sample(n=min(200_000, out.height), seed=42).sort(["date", "station_id"])
 
-    name = "station_daily_sample" if sample else "station_daily"
-    out_uri = f"s3://{PROC_BUCKET}/{AGG_PREFIX}/{name}.parquet"
-    _write_parquet_to_s3(out, out_uri)
-    logger.info(f"{name} written to {out_uri}")
+        out_uri = f"s3://{PROC_BUCKET}/{AGG_PREFIX}/station_daily_sample.parquet"
+        _write_parquet_to_s3(out, out_uri)
+        logger.info(f"station_daily_sample written to {out_uri}")
+        return station_daily
 
+    # Partition by month so date-range reads only touch the months they need,
+    # and sort each partition by station so single-station reads can skip
+    # row groups on station_id min/max statistics.
+    out = out.with_columns(
+        [
+            pl.col("date").dt.year().alias("year"),
+            pl.col("date").dt.month().alias("month"),
+        ]
+    ).sort(["station_id", "date"])
 
-def build_station_hourly() -> None:
-    trips = _trips_scan()
-    stations = _stations_scan()
+    out_prefix = f"s3://{PROC_BUCKET}/{AGG_PREFIX}/station_daily"
+    _write_partitioned_parquet_to_s3(out, out_prefix)
+    logger.info(f"station_daily written to {out_prefix}/year=*/month=*/")
 
-    # Aggregate checkouts by station, date, hour
-    checkouts = (
-        trips.with_columns(
-            [
-                pl.col("started_at").dt.date().alias("date"),
-                pl.col("started_at").dt.hour().alias("hour"),
-            ]
+    return station_daily
+
+
+def build_station_hourly(trips: pl.LazyFrame | None = None) -> None:
+    if trips is None:
+        trips = _trips_scan(
+            ["started_at", "ended_at", "date", "start_station_id", "end_station_id"]
         )
-        .group_by(["start_station_id", "date", "hour"])
-        .agg(pl.len().alias("num_checkouts"))
-        .rename({"start_station_id": "station_id"})
+    stations = _stations_scan()
+
+    # Checkouts are bucketed by started_at and returns by ended_at; both
+    # are stacked into one event stream and counted in a single group-by
+    events = pl.concat(
+        [
+            trips.select(
+                [
+                    pl.col("start_station_id").alias("station_id"),
+                    pl.col("date"),
+                    pl.col("started_at").dt.hour().alias("hour"),
+                    pl.lit(True).alias("is_checkout"),
+                ]
+            ),
+            trips.select(
+                [
+                    pl.col("end_station_id").alias("station_id"),
+                    pl.col("ended_at").dt.date().alias("date"),
+                    pl.col("ended_at").dt.hour().alias("hour"),
+                    pl.lit(False).alias("is_checkout"),
+                ]
+            ),
+        ]
     )
 
-    # Aggregate returns by station, date, hour (using ended_at time)
-    returns = (
-        trips.with_columns(
+    base = (
+        events.group_by(["station_id", "date", "hour"], maintain_order=False)
+        .agg(
             [
-                pl.col("ended_at").dt.date().alias("date"),
-                pl.col("ended_at").dt.hour().alias("hour"),
+                pl.col("is_checkout").sum().alias("num_checkouts"),
+                (~pl.col("is_checkout")).sum().alias("num_returns"),
             ]
         )
-        .group_by(["end_station_id", "date", "hour"])
-        .agg(pl.len().alias("num_returns"))
-        .rename({"end_station_id": "station_id"})
-    )
-
-    # Join checkouts and returns
-    base = checkouts.join(
-        returns, on=["station_id", "date", "hour"], how="full", coalesce=True
-    ).with_columns(
-        [
-            pl.col("num_checkouts").fill_null(0),
-            pl.col("num_returns").fill_null(0),
-        ]
-    ).with_columns(
-        # Calculate net_flow after fill_null to ensure signed integer result
-        (pl.col("num_checkouts") - pl.col("num_returns")).cast(pl.Int32).alias("net_flow"),
+        .with_columns(
+            # Cast to a signed type first so stations with more returns go negative
+            (pl.col("num_checkouts").cast(pl.Int32) - pl.col("num_returns").cast(pl.Int32)).alias("net_flow"),
+        )
     )
 
     out = (
@@ -220,8 +428,10 @@ def build_station_hourly() -> None:
                 "net_flow",
             ]
         )
-        .sort(["date", "hour", "station_id"])
-        .collect()
+        # The page reads one station at a time, so a single station_id sort
+        # key is enough for row-group skipping on its min/max statistics
+        .sort("station_id")
+        .collect(streaming=True)
     )
 
     out_uri = f"s3://{PROC_BUCKET}/{AGG_PREFIX}/station_hourly.parquet"
@@ -229,7 +439,9 @@ def build_station_hourly() -> None:
     logger.info(f"Station_hourly written to {out_uri}")
 
 
-def build_station_routes(top_n_per_station: int = 20) -> None:
+def build_station_routes(
+    top_n_per_station: int = 20, trips: pl.LazyFrame | None = None
+) -> None:
     """
     Build popular routes aggregate showing top station-to-station pairs.
 
@@ -239,15 +451,17 @@ def build_station_routes(top_n_per_station: int = 20) -> None:
     Args:
         top_n_per_station: Keep top N routes per station (both as origin and destination).
                           Default 20 means each station gets up to 20 outbound + 20 inbound routes.
+        trips: Pre-loaded trips (see _trips_collect); scanned from S3 if omitted.
     """
-    trips = _trips_scan()
+    if trips is None:
+        trips = _trips_scan(["start_station_id", "end_station_id", "duration_sec"])
     stations = _stations_scan()
 
     logger.info("Aggregating routes by start/end station pairs...")
 
     # Aggregate trips by start/end station pair
     all_routes = (
-        trips.group_by(["start_station_id", "end_station_id"])
+        trips.group_by(["start_station_id", "end_station_id"], maintain_order=False)
         .agg(
             [
                 pl.len().alias("trip_count"),
@@ -286,37 +500,38 @@ def build_station_routes(top_n_per_station: int = 20) -> None:
     )
 
     # Union and deduplicate (a route might be top for both its start and end station)
-    routes = pl.concat([top_outbound, top_inbound]).unique(
-        subset=["start_station_id", "end_station_id"]
+    routes = (
+        pl.concat([top_outbound, top_inbound])
+        .unique(subset=["start_station_id", "end_station_id"])
+        .collect()
     )
 
     logger.info("Joining station metadata...")
 
-    # Join start station info
-    routes_with_start = routes.join(
-        stations.select([
-            pl.col("station_id").alias("start_station_id"),
-            pl.col("station_name").alias("start_station_name"),
-            pl.col("lat").alias("start_lat"),
-            pl.col("lng").alias("start_lng"),
-        ]),
-        on="start_station_id",
-        how="left",
-        coalesce=True,
-    )
+    # Only a few thousand routes remain, so decorate them eagerly from one
+    # in-memory copy of the station coordinates, relabelled for each end
+    coords = stations.select(["station_id", "station_name", "lat", "lng"]).collect()
 
-    # Join end station info
     out = (
-        routes_with_start.join(
-            stations.select([
-                pl.col("station_id").alias("end_station_id"),
-                pl.col("station_name").alias("end_station_name"),
-                pl.col("lat").alias("end_lat"),
-                pl.col("lng").alias("end_lng"),
-            ]),
+        routes.join(
+            coords.rename({
+                "station_id": "start_station_id",
+                "station_name": "start_station_name",
+                "lat": "start_lat",
+                "lng": "start_lng",
+            }),
+            on="start_station_id",
+            how="left",
+        )
+        .join(
+            coords.rename({
+                "station_id": "end_station_id",
+                "station_name": "end_station_name",
+                "lat": "end_lat",
+                "lng": "end_lng",
+            }),
             on="end_station_id",
             how="left",
-            coalesce=True,
         )
         .select([
             "start_station_id",
@@ -331,7 +546,6 @@ def build_station_routes(top_n_per_station: int = 20) -> None:
             "avg_duration_sec",
         ])
         .sort("trip_count", descending=True)
-        .collect()
     )
 
     out_uri = f"s3://{PROC_BUCKET}/{AGG_PREFIX}/station_routes.parquet"
@@ -339,7 +553,7 @@ def build_station_routes(top_n_per_station: int = 20) -> None:
     logger.info(f"Station_routes written to {out_uri} ({len(out):,} routes)")
 
 
-def build_station_daily_detailed() -> None:
+def build_station_daily_detailed(trips: pl.LazyFrame | None = None) -> None:
     """
     Build detailed station daily aggregates with member_type and rideable_type dimensions.
 
@@ -348,63 +562,57 @@ def build_station_daily_detailed() -> None:
 
     Includes separate duration averages for checkouts vs returns.
     """
-    trips = _trips_scan()
+    if trips is None:
+        trips = _trips_scan(
+            [
+                "date",
+                "duration_sec",
+                "start_station_id",
+                "end_station_id",
+                "bike_number",
+                "member_type",
+                "rideable_type",
+            ]
+        )
     stations = _stations_scan()
 
     logger.info("Building station_daily_detailed with member_type and rideable_type dimensions...")
 
-    # Ensure columns exist for pre-2020 data (fill nulls with "unknown")
-    trips = trips.with_columns([
-        pl.when(pl.col("member_type").is_null())
-        .then(pl.lit("unknown"))
-        .otherwise(pl.col("member_type"))
-        .alias("member_type"),
-
-        pl.when(pl.col("rideable_type").is_null())
-        .then(pl.lit("unknown"))
-        .otherwise(pl.col("rideable_type"))
-        .alias("rideable_type"),
-    ])
+    # Filter straight off the scan so it is pushed into the Parquet reader,
+    # then ensure columns exist for pre-2020 data (fill nulls with "unknown")
+    trips = trips.filter(pl.col("duration_sec") > 0).with_columns(_FILL_UNKNOWN_TYPES)
 
-    # Aggregate checkouts (trips starting from this station)
-    checkouts = (
-        trips
-        .filter(pl.col("duration_sec") > 0)
-        .with_columns(pl.col("started_at").dt.date().alias("date"))
-        .group_by(["start_station_id", "date", "member_type", "rideable_type"])
-        .agg([
-            pl.len().alias("num_checkouts"),
-            pl.col("duration_sec").mean().alias("avg_duration_checkout_sec"),
-            pl.col("bike_number").n_unique().alias("distinct_bikes_out"),
-        ])
-        .rename({"start_station_id": "station_id"})
+    cols = ["date", "member_type", "rideable_type", "duration_sec"]
+
+    # Stack checkouts (trips starting here) and returns (trips ending here)
+    # into one event stream; a single group-by then yields both sides of every
+    # station-date-member-rideable combination without an outer join
+    events = pl.concat(
+        [
+            trips.select([pl.col("start_station_id").alias("station_id"), *cols, "bike_number"])
+            .with_columns(pl.lit(True).alias("is_checkout")),
+            # Return rows need no bike_number (distinct bikes count checkouts)
+            trips.select([pl.col("end_station_id").alias("station_id"), *cols])
+            .with_columns(pl.lit(False).alias("is_checkout")),
+        ],
+        how="diagonal",
     )
 
-    # Aggregate returns (trips ending at this station)
-    returns = (
-        trips
-        .filter(pl.col("duration_sec") > 0)
-        .with_columns(pl.col("started_at").dt.date().alias("date"))
-        .group_by(["end_station_id", "date", "member_type", "rideable_type"])
+    is_checkout = pl.col("is_checkout")
+    base = (
+        events.group_by(["station_id", "date", "member_type", "rideable_type"], maintain_order=False)
         .agg([
-            pl.len().alias("num_returns"),
-            pl.col("duration_sec").mean().alias("avg_duration_return_sec"),
+            is_checkout.sum().alias("num_checkouts"),
+            (~is_checkout).sum().alias("num_returns"),
+            pl.col("duration_sec").filter(is_checkout).mean().alias("avg_duration_checkout_sec"),
+            pl.col("duration_sec").filter(~is_checkout).mean().alias("avg_duration_return_sec"),
+            pl.col("bike_number").filter(is_checkout).n_unique().alias("distinct_bikes_out"),
         ])
-        .rename({"end_station_id": "station_id"})
+        .with_columns(
+            (pl.col("num_checkouts").cast(pl.Int32) - pl.col("num_returns").cast(pl.Int32)).alias("net_flow"),
+        )
     )
 
-    # Full outer join to preserve all station-date-member-rideable combinations
-    base = checkouts.join(
-        returns,
-        on=["station_id", "date", "member_type", "rideable_type"],
-        how="full",
-        coalesce=True
-    ).with_columns([
-        pl.col("num_checkouts").fill_null(0),
-        pl.col("num_returns").fill_null(0),
-        (pl.col("num_checkouts") - pl.col("num_returns")).alias("net_flow"),
-    ])
-
     # Join station metadata
     out = (
         base.join(stations, on="station_id", how="left", coalesce=True)
@@ -423,8 +631,10 @@ def build_station_daily_detailed() -> None:
             "distinct_bikes_out",
             "net_flow",
         ])
-        .sort(["date", "station_id", "member_type", "rideable_type"])
-        .collect()
+        # Readers filter on date; a single-key sort keeps its row-group
+        # min/max tight without ordering the rows within each day
+        .sort("date")
+        .collect(streaming=True)
     )
 
     out_uri = f"s3://{PROC_BUCKET}/{AGG_PREFIX}/station_daily_detailed.parquet"
@@ -432,48 +642,52 @@ def build_station_daily_detailed() -> None:
     logger.info(f"station_daily_detailed written to {out_uri} ({len(out):,} rows)")
 
 
-def build_system_daily_detailed() -> None:
-    """
-    Build system-wide daily aggregates with member_type and rideable_type dimensions.
-
-    Provides fast filtering for system-level trends by member and bike type.
-    """
-    trips = _trips_scan()
-
-    logger.info("Building system_daily_detailed with member_type and rideable_type dimensions...")
+def _system_daily_detailed_frame(trips: pl.LazyFrame | None = None) -> pl.DataFrame:
+    """Aggregate trips by (date, member_type, rideable_type)."""
+    if trips is None:
+        trips = _trips_scan(["date", "duration_sec", "member_type", "rideable_type"])
 
     # Ensure columns exist for pre-2020 data
-    trips = trips.with_columns([
-        pl.when(pl.col("member_type").is_null())
-        .then(pl.lit("unknown"))
-        .otherwise(pl.col("member_type"))
-        .alias("member_type"),
-
-        pl.when(pl.col("rideable_type").is_null())
-        .then(pl.lit("unknown"))
-        .otherwise(pl.col("rideable_type"))
-        .alias("rideable_type"),
-    ])
+    trips = trips.filter(pl.col("duration_sec") > 0).with_columns(_FILL_UNKNOWN_TYPES)
 
-    out = (
+    return (
         trips
-        .filter(pl.col("duration_sec") > 0)
-        .with_columns(pl.col("started_at").dt.date().alias("date"))
-        .group_by(["date", "member_type", "rideable_type"])
+        .group_by(["date", "member_type", "rideable_type"], maintain_order=False)
         .agg([
             pl.len().alias("trips"),
-            pl.col("duration_sec").mean().alias("avg_duration_sec"),
+            pl.col("duration_sec").sum().alias("sum_duration_sec"),
         ])
-        .sort(["date", "member_type", "rideable_type"])
+        # The sum is kept in the output so coarser rollups stay exact
+        .with_columns(
+            (pl.col("sum_duration_sec") / pl.col("trips")).alias("avg_duration_sec")
+        )
+        .sort("date")
         .collect()
     )
 
+
+def build_system_daily_detailed(trips: pl.LazyFrame | None = None) -> pl.DataFrame:
+    """
+    Build system-wide daily aggregates with member_type and rideable_type dimensions.
+
+    Provides fast filtering for system-level trends by member and bike type.
+
+    Returns:
+        The written frame, so build_system_daily can roll it up without
+        scanning trips again
+    """
+    logger.info("Building system_daily_detailed with member_type and rideable_type dimensions...")
+
+    out = _system_daily_detailed_frame(trips)
+
     out_uri = f"s3://{PROC_BUCKET}/{AGG_PREFIX}/system_daily_detailed.parquet"
     _write_parquet_to_s3(out, out_uri)
     logger.info(f"system_daily_detailed written to {out_uri} ({len(out):,} rows)")
 
+    return out
 
-def build_time_aggregated() -> None:
+
+def build_time_aggregated(trips: pl.LazyFrame | None = None) -> None:
     """
     Build time-based aggregates for the Time Aggregation page.
 
@@ -481,33 +695,40 @@ def build_time_aggregated() -> None:
     Each level can be filtered by member_type and rideable_type.
     Includes separate counts for checkouts, returns, and net flow.
     """
-    trips = _trips_scan()
+    if trips is None:
+        trips = _trips_scan(["date", "duration_sec", "member_type", "rideable_type"])
 
     logger.info("Building time_aggregated with day/week/month/year dimensions...")
 
     # Ensure columns exist for pre-2020 data
-    trips_filtered = trips.with_columns([
-        pl.when(pl.col("member_type").is_null())
-        .then(pl.lit("unknown"))
-        .otherwise(pl.col("member_type"))
-        .alias("member_type"),
-
-        pl.when(pl.col("rideable_type").is_null())
-        .then(pl.lit("unknown"))
-        .otherwise(pl.col("rideable_type"))
-        .alias("rideable_type"),
-    ]).filter(pl.col("duration_sec") > 0)
+    trips_filtered = trips.filter(pl.col("duration_sec") > 0).with_columns(_FILL_UNKNOWN_TYPES)
 
-    # Day level aggregation
-    logger.info("  - Aggregating by day...")
-    day_agg = (
+    # One pass over the trips: every level below is a function of the start
+    # date, so each is rolled up from this small (date x member x bike) table
+    # rather than re-aggregating the trips. Duration is carried as a sum so
+    # the coarser means stay trip-weighted.
+    daily = (
         trips_filtered
-        .with_columns(pl.col("started_at").dt.date().alias("agg_value_date"))
-        .group_by(["agg_value_date", "member_type", "rideable_type"])
+        .group_by(["date", "member_type", "rideable_type"], maintain_order=False)
         .agg([
             pl.len().alias("total_trips"),
-            pl.col("duration_sec").mean().alias("avg_duration_sec"),
+            pl.col("duration_sec").sum().alias("duration_sum"),
         ])
+        .collect(streaming=True)
+        .lazy()
+    )
+    rollup = [
+        pl.col("total_trips").sum().alias("total_trips"),
+        (pl.col("duration_sum").sum() / pl.col("total_trips").sum()).alias("avg_duration_sec"),
+    ]
+
+    # Day level aggregation
+    logger.info("  - Aggregating by day...")
+    day_agg = (
+        daily
+        .with_columns(pl.col("date").alias("agg_value_date"))
+        .group_by(["agg_value_date", "member_type", "rideable_type"], maintain_order=False)
+        .agg(rollup)
         .with_columns([
             pl.lit("day").alias("agg_level"),
             pl.col("agg_value_date").cast(pl.Utf8).alias("agg_value"),
@@ -521,18 +742,16 @@ def build_time_aggregated() -> None:
 
     # Day of week aggregation
     logger.info("  - Aggregating by day of week...")
-    dow_map = {0: "Monday", 1: "Tuesday", 2: "Wednesday", 3: "Thursday", 4: "Friday", 5: "Saturday", 6: "Sunday"}
+    # Polars weekday() is ISO (Monday=1 .. Sunday=7)
+    dow_map = {1: "Monday", 2: "Tuesday", 3: "Wednesday", 4: "Thursday", 5: "Friday", 6: "Saturday", 7: "Sunday"}
     dow_agg = (
-        trips_filtered
-        .with_columns(pl.col("started_at").dt.weekday().alias("weekday"))
-        .group_by(["weekday", "member_type", "rideable_type"])
-        .agg([
-            pl.len().alias("total_trips"),
-            pl.col("duration_sec").mean().alias("avg_duration_sec"),
-        ])
+        daily
+        .with_columns(pl.col("date").dt.weekday().alias("weekday"))
+        .group_by(["weekday", "member_type", "rideable_type"], maintain_order=False)
+        .agg(rollup)
         .with_columns([
             pl.lit("day_of_week").alias("agg_level"),
-            pl.col("weekday").replace(dow_map).alias("agg_value"),
+            pl.col("weekday").replace(dow_map, default=None, return_dtype=pl.Utf8).alias("agg_value"),
             pl.col("weekday").cast(pl.Int32).alias("agg_sort_key"),  # Cast to Int32
             pl.col("total_trips").alias("total_checkouts"),
             pl.col("total_trips").alias("total_returns"),
@@ -546,16 +765,13 @@ def build_time_aggregated() -> None:
     month_map = {1: "January", 2: "February", 3: "March", 4: "April", 5: "May", 6: "June",
                  7: "July", 8: "August", 9: "September", 10: "October", 11: "November", 12: "December"}
     month_agg = (
-        trips_filtered
-        .with_columns(pl.col("started_at").dt.month().alias("month"))
-        .group_by(["month", "member_type", "rideable_type"])
-        .agg([
-            pl.len().alias("total_trips"),
-            pl.col("duration_sec").mean().alias("avg_duration_sec"),
-        ])
+        daily
+        .with_columns(pl.col("date").dt.month().alias("month"))
+        .group_by(["month", "member_type", "rideable_type"], maintain_order=False)
+        .agg(rollup)
         .with_columns([
             pl.lit("month").alias("agg_level"),
-            pl.col("month").replace(month_map).alias("agg_value"),
+            pl.col("month").replace(month_map, default=None, return_dtype=pl.Utf8).alias("agg_value"),
             pl.col("month").cast(pl.Int32).alias("agg_sort_key"),  # Cast to Int32
             pl.col("total_trips").alias("total_checkouts"),
             pl.col("total_trips").alias("total_returns"),
@@ -567,13 +783,10 @@ def build_time_aggregated() -> None:
     # Year aggregation
     logger.info("  - Aggregating by year...")
     year_agg = (
-        trips_filtered
-        .with_columns(pl.col("started_at").dt.year().alias("year"))
-        .group_by(["year", "member_type", "rideable_type"])
-        .agg([
-            pl.len().alias("total_trips"),
-            pl.col("duration_sec").mean().alias("avg_duration_sec"),
-        ])
+        daily
+        .with_columns(pl.col("date").dt.year().alias("year"))
+        .group_by(["year", "member_type", "rideable_type"], maintain_order=False)
+        .agg(rollup)
         .with_columns([
             pl.lit("year").alias("agg_level"),
             pl.col("year").cast(pl.Utf8).alias("agg_value"),
@@ -599,27 +812,26 @@ def build_time_aggregated() -> None:
     logger.info(f"time_aggregated written to {out_uri} ({len(out):,} rows)")
 
 
-def build_routes_by_member_rideable(top_n: int = 100) -> None:
+def build_routes_by_member_rideable(
+    top_n: int = 100, trips: pl.LazyFrame | None = None
+) -> None:
     """
     Build top routes broken out by member_type and rideable_type.
 
     Allows the Trip Analytics page to filter Popular Routes by member/bike type
     without scanning raw trip data.
     """
-    trips = _trips_scan()
+    if trips is None:
+        trips = _trips_scan(
+            ["start_station_id", "end_station_id", "duration_sec", "member_type", "rideable_type"]
+        )
     stations = _stations_scan()
 
-    trips = trips.with_columns([
-        pl.when(pl.col("member_type").is_null()).then(pl.lit("unknown")).otherwise(pl.col("member_type")).alias("member_type"),
-        pl.when(pl.col("rideable_type").is_null()).then(pl.lit("unknown")).otherwise(pl.col("rideable_type")).alias("rideable_type"),
-    ])
+    trips = trips.filter(pl.col("duration_sec") > 0).with_columns(_FILL_UNKNOWN_TYPES)
 
     all_routes = (
-        trips.filter(
-            (pl.col("duration_sec") > 0) &
-            (pl.col("start_station_id") != pl.col("end_station_id"))
-        )
-        .group_by(["start_station_id", "end_station_id", "member_type", "rideable_type"])
+        trips.filter(pl.col("start_station_id") != pl.col("end_station_id"))
+        .group_by(["start_station_id", "end_station_id", "member_type", "rideable_type"], maintain_order=False)
         .agg([
             pl.len().alias("trip_count"),
             pl.col("duration_sec").mean().alias("avg_duration_sec"),
@@ -653,7 +865,6 @@ def build_routes_by_member_rideable(top_n: int = 100) -> None:
             coalesce=True,
         )
         .select(["start_station_name", "end_station_name", "member_type", "rideable_type", "trip_count", "avg_duration_sec"])
-        .sort(["member_type", "rideable_type", "trip_count"], descending=[False, False, True])
         .collect()
     )
 
@@ -662,33 +873,32 @@ def build_routes_by_member_rideable(top_n: int = 100) -> None:
     logger.info(f"routes_by_member_rideable written to {out_uri} ({len(out):,} rows)")
 
 
-def build_trip_patterns() -> None:
+def build_trip_patterns(trips: pl.LazyFrame | None = None) -> None:
     """
     Build hourly and weekday trip counts by year_month, member_type, and rideable_type.
 
     Replaces raw trip scanning for the Temporal Patterns tab. Filtered views
     are computed in-memory by slicing this small table.
     """
-    trips = _trips_scan()
+    if trips is None:
+        trips = _trips_scan(
+            ["started_at", "duration_sec", "member_type", "rideable_type"]
+        )
 
-    trips = trips.with_columns([
-        pl.when(pl.col("member_type").is_null()).then(pl.lit("unknown")).otherwise(pl.col("member_type")).alias("member_type"),
-        pl.when(pl.col("rideable_type").is_null()).then(pl.lit("unknown")).otherwise(pl.col("rideable_type")).alias("rideable_type"),
-    ])
+    trips = trips.filter(pl.col("duration_sec") > 0).with_columns(_FILL_UNKNOWN_TYPES)
 
     out = (
-        trips.filter(pl.col("duration_sec") > 0)
+        trips
         .with_columns([
             pl.col("started_at").dt.strftime("%Y-%m").alias("year_month"),
             pl.col("started_at").dt.hour().alias("hour"),
             pl.col("started_at").dt.weekday().alias("weekday"),
         ])
-        .group_by(["year_month", "hour", "weekday", "member_type", "rideable_type"])
+        .group_by(["year_month", "hour", "weekday", "member_type", "rideable_type"], maintain_order=False)
         .agg([
             pl.len().alias("trip_count"),
             pl.col("duration_sec").mean().alias("avg_duration_sec"),
         ])
-        .sort(["year_month", "hour", "weekday"])
         .collect()
     )
 
@@ -697,24 +907,22 @@ def build_trip_patterns() -> None:
     logger.info(f"trip_patterns written to {out_uri} ({len(out):,} rows)")
 
 
-def build_trip_duration_buckets() -> None:
+def build_trip_duration_buckets(trips: pl.LazyFrame | None = None) -> None:
     """
     Build trip duration distribution in 5-minute buckets by year_month, member_type, rideable_type.
 
     Replaces raw trip scanning for the Duration Analysis tab. Bucket 120 captures
     all trips >= 120 minutes (2 hours). Trips > 24 hours are excluded as errors.
     """
-    trips = _trips_scan()
+    if trips is None:
+        trips = _trips_scan(
+            ["started_at", "duration_sec", "member_type", "rideable_type"]
+        )
 
-    trips = trips.with_columns([
-        pl.when(pl.col("member_type").is_null()).then(pl.lit("unknown")).otherwise(pl.col("member_type")).alias("member_type"),
-        pl.when(pl.col("rideable_type").is_null()).then(pl.lit("unknown")).otherwise(pl.col("rideable_type")).alias("rideable_type"),
-    ])
+    trips = trips.filter(pl.col("duration_sec") > 0).with_columns(_FILL_UNKNOWN_TYPES)
 
     out = (
-        trips.filter(
-            (pl.col("duration_sec") > 0) & (pl.col("duration_sec") < 86400)
-        )
+        trips.filter(pl.col("duration_sec") < 86400)
         .with_columns([
             pl.col("started_at").dt.strftime("%Y-%m").alias("year_month"),
             (pl.col("duration_sec") / 60).alias("duration_min"),
@@ -726,9 +934,8 @@ def build_trip_duration_buckets() -> None:
             .cast(pl.Int32)
             .alias("bucket_start_min")
         )
-        .group_by(["year_month", "bucket_start_min", "member_type", "rideable_type"])
+        .group_by(["year_month", "bucket_start_min", "member_type", "rideable_type"], maintain_order=False)
         .agg(pl.len().alias("trip_count"))
-        .sort(["year_month", "bucket_start_min"])
         .collect()
     )
 
@@ -737,43 +944,76 @@ def build_trip_duration_buckets() -> None:
     logger.info(f"trip_duration_buckets written to {out_uri} ({len(out):,} rows)")
 
 
+def build_station_facets() -> None:
+    """
+    Build the sorted, de-duplicated filter options for the app sidebars.
+
+    Writes a single-row table with one list column per geocoded facet
+    (zip_codes, cities). Columns that the station dimension does not have
+    yet (i.e. geocoding has not been run) are written as empty lists.
+    """
+    stations = _stations_scan()
+    schema = stations.schema
+
+    facets = []
+    for col, alias in [("zip_code", "zip_codes"), ("city", "cities")]:
+        if col in schema:
+            facets.append(
+                pl.col(col)
+                .filter(pl.col(col).is_not_null() & (pl.col(col) != "Unknown"))
+                .unique()
+                .sort()
+                .implode()
+                .alias(alias)
+            )
+        else:
+            facets.append(pl.lit([], dtype=pl.List(pl.Utf8)).alias(alias))
+
+    out = stations.select(facets).collect()
+
+    out_uri = f"s3://{PROC_BUCKET}/{FACETS_KEY}"
+    _write_parquet_to_s3(out, out_uri)
+    logger.info(f"station_facets written to {out_uri}")
+
+
 def build_all_summaries() -> None:
     """Build all summary/aggregate tables from master trips data."""
     logger.info("Building all summary tables...")
     logger.info("=" * 60)
 
-    build_system_daily()
-    logger.info("")
-
-    build_system_daily_detailed()
-    logger.info("")
-
-    build_station_daily(sample=False)
-    logger.info("")
-
-    build_station_daily(sample=True)
-    logger.info("")
-
-    build_station_daily_detailed()
+    logger.info("Loading master trips...")
+    trips = _trips_collect().lazy()
+    # Warm the station cache before the builders race to fill it
+    _stations_df()
     logger.info("")
 
-    build_station_hourly()
-    logger.info("")
-
-    build_station_routes()
-    logger.info("")
-
-    build_routes_by_member_rideable()
-    logger.info("")
-
-    build_trip_patterns()
-    logger.info("")
-
-    build_trip_duration_buckets()
-    logger.info("")
-
-    build_time_aggregated()
-    logger.info("")
+    def system_daily_tables() -> None:
+        # system_daily is rolled up from the detailed table, so the two run
+        # as one chain
+        build_system_daily(build_system_daily_detailed(trips))
+
+    def station_daily_tables() -> None:
+        # The sample is drawn from the full frame rather than re-aggregated
+        station_daily = build_station_daily(trips=trips)
+        build_station_daily(sample=True, station_daily=station_daily)
+
+    # The tables are independent of each other; run them concurrently so
+    # one builder's S3 writes overlap another's aggregation
+    with ThreadPoolExecutor(max_workers=SUMMARY_WORKERS) as pool:
+        futures = [
+            pool.submit(system_daily_tables),
+            pool.submit(station_daily_tables),
+            pool.submit(build_station_daily_detailed, trips=trips),
+            pool.submit(build_station_hourly, trips=trips),
+            pool.submit(build_station_routes, trips=trips),
+            pool.submit(build_routes_by_member_rideable, trips=trips),
+            pool.submit(build_trip_patterns, trips=trips),
+            pool.submit(build_trip_duration_buckets, trips=trips),
+            pool.submit(build_time_aggregated, trips=trips),
+            pool.submit(build_station_facets),
+        ]
+        for future in as_completed(futures):
+            future.result()
 
     logger.info("=" * 60)
     logger.info("All summaries built successfully!")
@@ -8,16 +8,23 @@ import polars as pl
 # --------------------------------------------------
 # Station ID normalization (schema drift fix)
 # --------------------------------------------------
-def normalize_station_id(expr: pl.Expr) -> pl.Expr:
+def normalize_station_id(
+    expr: pl.Expr, dtype: pl.PolarsDataType | None = None
+) -> pl.Expr:
     """
     Normalize station IDs that may appear as floats, ints, or strings into Int64.
 
+    Pass the source `dtype` when it is known: numeric IDs are then cast
+    directly, and only string IDs go through the text path.
+
     Examples:
       31000.0    -> 31000
       "31000"    -> 31000
       "31000.0"  -> 31000
     """
-    return expr.cast(pl.Utf8).str.replace(r"\.0$", "").cast(pl.Int64)
+    if dtype is not None and dtype.is_numeric():
+        return expr.cast(pl.Int64)
+    return expr.cast(pl.Utf8).str.strip_suffix(".0").cast(pl.Int64)
 
 
 # --------------------------------------------------
@@ -74,14 +81,37 @@ CANONICAL_COLUMNS = [
 ]
 
 
-def normalize_trip_schema(df: pl.DataFrame, stations: pl.DataFrame) -> pl.DataFrame:
+# Canonical columns that may be absent from a raw file, and their null type
+_MISSING_DTYPES: Mapping[str, pl.DataType] = {
+    "ride_id": pl.Utf8,
+    "rideable_type": pl.Utf8,
+    "start_station_name": pl.Utf8,
+    "end_station_name": pl.Utf8,
+    "bike_number": pl.Utf8,
+    "member_type": pl.Utf8,
+    "start_lat": pl.Float64,
+    "start_lng": pl.Float64,
+    "end_lat": pl.Float64,
+    "end_lng": pl.Float64,
+    "started_at": pl.Datetime,
+    "ended_at": pl.Datetime,
+    "duration_sec": pl.Int64,
+}
+
+
+def normalize_trip_schema(
+    df: pl.DataFrame | pl.LazyFrame, stations: pl.DataFrame
+) -> pl.DataFrame | pl.LazyFrame:
     """
-    Normalize a raw CaBi month DataFrame into a canonical schema.
+    Normalize a raw CaBi month DataFrame (or LazyFrame) into a canonical schema.
+
+    A LazyFrame in gives a LazyFrame out, so callers can stream the result.
 
     - Handles pre/post column names
     - Parses datetimes
     - Computes duration_sec
     - Normalizes station IDs to Int64 (critical)
+    - Lowercases member_type
     - Casts coordinates to Float64 when present
     - Fills missing canonical columns with nulls
     """
@@ -92,76 +122,78 @@ def normalize_trip_schema(df: pl.DataFrame, stations: pl.DataFrame) -> pl.DataFr
     # Rename post-style columns (harmless if already canonical)
     df = df.rename({k: v for k, v in _POST_RENAME.items() if k in df.columns})
 
-    # Parse datetimes (robust to already-datetime)
-    if "started_at" in df.columns:
-        df = df.with_columns(
-            pl.col("started_at").str.strptime(pl.Datetime, strict=False)
-        ).with_columns(
-            [
-                pl.col("started_at").dt.day().alias("day"),
-                pl.col("started_at").dt.hour().alias("hour"),
-                pl.col("started_at").dt.weekday().alias("weekday"),
-            ]
-        )
+    schema = df.schema
+    present = set(schema)
+
+    # All parsing and derived columns go in one with_columns batch; derived
+    # columns reuse the parsing expressions instead of waiting for a second
+    # pass over the parsed frame
+    exprs = []
 
-    if "ended_at" in df.columns:
-        df = df.with_columns(pl.col("ended_at").str.strptime(pl.Datetime, strict=False))
+    started = ended = None
+    if "started_at" in present:
+        started = pl.col("started_at").str.strptime(pl.Datetime, strict=False)
+        exprs += [
+            started.alias("started_at"),
+            started.dt.day().alias("day"),
+            started.dt.hour().alias("hour"),
+            started.dt.weekday().alias("weekday"),
+        ]
+
+    if "ended_at" in present:
+        ended = pl.col("ended_at").str.strptime(pl.Datetime, strict=False)
+        exprs.append(ended.alias("ended_at"))
 
     # Compute duration seconds when possible
-    if "duration_sec" not in df.columns and {"started_at", "ended_at"}.issubset(
-        df.columns
-    ):
-        df = df.with_columns(
-            (pl.col("ended_at") - pl.col("started_at"))
-            .dt.total_seconds()
-            .cast(pl.Int64)
-            .alias("duration_sec")
+    if "duration_sec" not in present and started is not None and ended is not None:
+        exprs.append(
+            (ended - started).dt.total_seconds().cast(pl.Int64).alias("duration_sec")
         )
 
     # Normalize station IDs (schema drift fix)
-    for col in ["start_station_id", "end_station_id"]:
-        if col in df.columns:
-            df = df.with_columns(normalize_station_id(pl.col(col)).alias(col))
+    exprs += [
+        normalize_station_id(pl.col(c), schema[c]).alias(c)
+        for c in ("start_station_id", "end_station_id")
+        if c in present
+    ]
+
+    # Pre-2020 files use "Member"/"Casual"; lowercase once so readers can
+    # filter with a plain is_in instead of per-row case folding
+    if "member_type" in present:
+        exprs.append(pl.col("member_type").str.to_lowercase())
+
+    if exprs:
+        df = df.with_columns(exprs)
+
+    if isinstance(df, pl.LazyFrame):
+        stations = stations.lazy()
+
+    # One coordinate projection, relabelled for each role
+    coords = stations.select(["station_id", "lat", "lng"])
 
     df = df.join(
-        stations.select(
-            pl.col("station_id").alias("start_station_id"),
-            pl.col("lat").alias("start_lat"),
-            pl.col("lng").alias("start_lng"),
+        coords.rename(
+            {"station_id": "start_station_id", "lat": "start_lat", "lng": "start_lng"}
         ),
         on="start_station_id",
         how="left",
     ).join(
-        stations.select(
-            pl.col("station_id").alias("end_station_id"),
-            pl.col("lat").alias("end_lat"),
-            pl.col("lng").alias("end_lng"),
+        coords.rename(
+            {"station_id": "end_station_id", "lat": "end_lat", "lng": "end_lng"}
         ),
         on="end_station_id",
         how="left",
     )
 
-    # Fill missing columns with nulls
-    for col in CANONICAL_COLUMNS:
-        if col not in df.columns:
-            if col in {
-                "ride_id",
-                "rideable_type",
-                "start_station_name",
-                "end_station_name",
-                "bike_number",
-                "member_type",
-            }:
-                df = df.with_columns(pl.lit(None, dtype=pl.Utf8).alias(col))
-
-            elif col in {"start_lat", "start_lng", "end_lat", "end_lng"}:
-                df = df.with_columns(pl.lit(None, dtype=pl.Float64).alias(col))
-
-            elif col in {"started_at", "ended_at"}:
-                df = df.with_columns(pl.lit(None, dtype=pl.Datetime).alias(col))
-
-            elif col == "duration_sec":
-                df = df.with_columns(pl.lit(None, dtype=pl.Int64).alias(col))
-
-    # Select canonical order
-    return df.select(CANONICAL_COLUMNS)
+    # Select canonical order, filling missing columns with typed nulls
+    present = set(df.columns)
+    return df.select(
+        [
+            (
+                pl.col(col)
+                if col in present or col not in _MISSING_DTYPES
+                else pl.lit(None, dtype=_MISSING_DTYPES[col]).alias(col)
+            )
+            for col in CANONICAL_COLUMNS
+        ]
+    )
@@ -4,6 +4,9 @@ Reusable Folium map visualization components for Capital Bikeshare analytics.
 
 from __future__ import annotations
 
+from functools import lru_cache
+
+import numpy as np
 import polars as pl
 import folium
 from folium.plugins import MarkerCluster
@@ -14,13 +17,25 @@ import branca.colormap as cm
 DC_CENTER = [38.9072, -77.0369]
 DEFAULT_ZOOM = 12
 
+# Above this many stations, markers are clustered unless the caller says otherwise
+CLUSTER_THRESHOLD = 100
+
+# Branca colormaps by scheme name
+_SCHEMES = {
+    "YlOrRd": cm.linear.YlOrRd_09,
+    "Blues": cm.linear.Blues_09,
+    "Viridis": cm.linear.viridis,
+    "Greens": cm.linear.Greens_09,
+    "Reds": cm.linear.Reds_09,
+}
+
 
 def create_station_map(
     stations_df: pl.DataFrame,
     metric_col: str = "total_checkouts",
     color_scheme: str = "YlOrRd",
     zoom_start: int = DEFAULT_ZOOM,
-    use_clustering: bool = False,
+    use_clustering: bool | None = None,
     tooltip_cols: dict[str, str] = None,
 ) -> folium.Map:
     """
@@ -31,7 +46,8 @@ def create_station_map(
         metric_col: Column name to use for color-coding circles
         color_scheme: Color scheme name (YlOrRd, Blues, Viridis, etc.)
         zoom_start: Initial zoom level
-        use_clustering: Whether to use marker clustering (recommended for > 100 stations)
+        use_clustering: Whether to use marker clustering; defaults to clustering
+            when there are more than CLUSTER_THRESHOLD stations
         tooltip_cols: Optional dict of {column_name: label} for additional metrics in tooltip
 
     Returns:
@@ -51,72 +67,100 @@ def create_station_map(
         raise ValueError(f"Missing required columns: {missing}")
 
     # Create colormap
-    metric_values = stations_df[metric_col].to_list()
-    vmin = min(metric_values)
-    vmax = max(metric_values)
+    vmin = stations_df[metric_col].min()
+    vmax = stations_df[metric_col].max()
 
     colormap = _get_colormap(color_scheme, vmin, vmax)
 
     # Add colormap legend to map
     colormap.add_to(m)
 
+    # Skip stations with missing or zero coordinates
+    stations_df = stations_df.filter(_has_coords("lat", "lng"))
+
     # Prepare marker cluster if needed
+    if use_clustering is None:
+        use_clustering = stations_df.height > CLUSTER_THRESHOLD
     if use_clustering:
         marker_cluster = MarkerCluster().add_to(m)
         target = marker_cluster
     else:
         target = m
 
-    # Add circle markers for each station
-    for row in stations_df.iter_rows(named=True):
-        lat = row["lat"]
-        lng = row["lng"]
-        station_name = row["station_name"]
-        metric_value = row[metric_col]
-
-        # Skip if coordinates are invalid
-        if not lat or not lng or lat == 0 or lng == 0:
-            continue
-
-        # Determine color based on metric value
-        color = colormap(metric_value)
-
-        # Scale radius based on metric value (min 5, max 20)
-        radius = _scale_radius(metric_value, vmin, vmax, min_r=5, max_r=20)
-
-        # Build tooltip with multiple metrics
-        tooltip_parts = [f"<b>{station_name}</b>"]
-
-        # Add main metric
-        tooltip_parts.append(f"{_format_metric(metric_col)}: {metric_value:,.0f}")
-
-        # Add additional metrics if provided
-        if tooltip_cols:
-            for col, label in tooltip_cols.items():
-                if col in row:
-                    value = row[col]
-                    # Handle None/null values
-                    if value is None:
-                        tooltip_parts.append(f"{label}: N/A")
-                    # Format floats vs integers differently
-                    elif isinstance(value, float):
-                        tooltip_parts.append(f"{label}: {value:,.1f}")
-                    else:
-                        tooltip_parts.append(f"{label}: {value:,}")
-
-        tooltip_text = "<br>".join(tooltip_parts)
-
-        # Add circle marker
-        folium.CircleMarker(
-            location=[lat, lng],
-            radius=radius,
-            popup=folium.Popup(tooltip_text, max_width=300),
-            tooltip=tooltip_text,
-            color=color,
-            fill=True,
-            fillColor=color,
-            fillOpacity=0.7,
-            weight=2,
+    # Pull each column out once instead of building a dict per row
+    lats = stations_df["lat"].cast(pl.Float64).to_numpy()
+    lngs = stations_df["lng"].cast(pl.Float64).to_numpy()
+
+    # Position of each station within [vmin, vmax], computed in one pass
+    values = stations_df[metric_col].cast(pl.Float64).to_numpy()
+    if vmax == vmin:
+        norm = np.full(len(values), 0.5)
+    else:
+        norm = np.clip(np.nan_to_num((values - vmin) / (vmax - vmin)), 0.0, 1.0)
+
+    # Scale radius based on metric value (min 5, max 20)
+    radii = 5 + norm * 15
+
+    # Sample the colormap once into a lookup table and index it per station
+    lut = [colormap(vmin + (vmax - vmin) * j / 255) for j in range(256)]
+    color_idx = np.rint(norm * 255).astype(np.int32)
+
+    # Build every tooltip up front: numbers are formatted one column at a
+    # time (float vs int decided from the dtype) and joined in Polars
+    tooltip_parts = [
+        pl.format("<b>{}</b>", pl.col("station_name").fill_null("Unknown")),
+        pl.concat_str(
+            [
+                pl.lit(f"{_format_metric(metric_col)}: "),
+                pl.lit(_format_numbers(stations_df[metric_col], ",.0f")).fill_null("N/A"),
+            ]
+        ),
+    ]
+    for col, label in (tooltip_cols or {}).items():
+        if col in stations_df.columns:
+            series = stations_df[col]
+            spec = ",.1f" if series.dtype.is_float() else ","
+            tooltip_parts.append(
+                pl.concat_str(
+                    [pl.lit(f"{label}: "), pl.lit(_format_numbers(series, spec)).fill_null("N/A")]
+                )
+            )
+    tooltips = (
+        stations_df.select(pl.concat_str(tooltip_parts, separator="<br>"))
+        .to_series()
+        .to_list()
+    )
+
+    # All station markers go into one GeoJson layer: Folium renders a single
+    # template and Leaflet builds the circles in one JS loop, instead of one
+    # Jinja-rendered CircleMarker per station
+    features = [
+        {
+            "type": "Feature",
+            "id": str(i),
+            "geometry": {"type": "Point", "coordinates": [float(lngs[i]), float(lats[i])]},
+            "properties": {
+                "radius": float(radii[i]),
+                "color": lut[color_idx[i]],
+                "tooltip": tooltips[i],
+            },
+        }
+        for i in range(stations_df.height)
+    ]
+
+    if features:
+        folium.GeoJson(
+            {"type": "FeatureCollection", "features": features},
+            marker=folium.CircleMarker(fill=True),
+            style_function=lambda f: {
+                "radius": f["properties"]["radius"],
+                "color": f["properties"]["color"],
+                "fillColor": f["properties"]["color"],
+                "fillOpacity": 0.7,
+                "weight": 2,
+            },
+            tooltip=folium.GeoJsonTooltip(fields=["tooltip"], labels=False),
+            popup=folium.GeoJsonPopup(fields=["tooltip"], labels=False, max_width=300),
         ).add_to(target)
 
     return m
@@ -128,20 +172,26 @@ def create_route_map(
     origin_lat: float,
     origin_lng: float,
     top_n: int = 10,
+    is_outbound: bool = True,
 ) -> folium.Map:
     """
-    Create a map showing popular routes from a specific origin station.
+    Create a map showing popular routes from (or to) a specific station.
 
     Args:
         routes_df: DataFrame with columns: end_station_name, end_lat, end_lng, trip_count
-        origin_station_name: Name of the origin station
-        origin_lat: Origin latitude
-        origin_lng: Origin longitude
+            (start_* columns instead when is_outbound is False)
+        origin_station_name: Name of the selected station
+        origin_lat: Selected station latitude
+        origin_lng: Selected station longitude
         top_n: Number of top routes to display
+        is_outbound: True to plot destinations, False to plot origins
 
     Returns:
         Folium Map object
     """
+    # The other end of each route is the destination (outbound) or origin (inbound)
+    other = "end" if is_outbound else "start"
+
     # Create base map centered on origin
     m = folium.Map(
         location=[origin_lat, origin_lng],
@@ -161,29 +211,31 @@ def create_route_map(
     top_routes = routes_df.head(top_n)
 
     # Get trip count range for line width scaling
-    trip_counts = top_routes["trip_count"].to_list()
-    min_trips = min(trip_counts)
-    max_trips = max(trip_counts)
-
-    # Add lines and destination markers for each route
-    for idx, row in enumerate(top_routes.iter_rows(named=True), start=1):
-        end_lat = row["end_lat"]
-        end_lng = row["end_lng"]
-        end_station_name = row["end_station_name"]
-        trip_count = row["trip_count"]
-
-        # Skip invalid coordinates
-        if not end_lat or not end_lng:
-            continue
+    min_trips = top_routes["trip_count"].min()
+    max_trips = top_routes["trip_count"].max()
+
+    # Keep each route's rank, then drop routes without coordinates
+    drawable = (
+        top_routes.with_row_index("rank", offset=1)
+        .filter(_has_coords(f"{other}_lat", f"{other}_lng"))
+        .select(
+            "rank", f"{other}_lat", f"{other}_lng", f"{other}_station_name", "trip_count"
+        )
+    )
 
-        # Scale line weight based on trip count (min 2, max 8)
-        weight = _scale_value(trip_count, min_trips, max_trips, min_val=2, max_val=8)
+    # Scale line weight based on trip count (min 2, max 8)
+    counts = drawable["trip_count"].cast(pl.Float64).fill_null(0).to_numpy()
+    weights = _scale_values(counts, min_trips, max_trips, min_val=2, max_val=8)
 
+    # Add lines and destination markers for each route
+    for i, (idx, end_lat, end_lng, end_station_name, trip_count) in enumerate(
+        drawable.rows()
+    ):
         # Draw polyline from origin to destination
         folium.PolyLine(
             locations=[[origin_lat, origin_lng], [end_lat, end_lng]],
             color="blue",
-            weight=weight,
+            weight=float(weights[i]),
             opacity=0.6,
             popup=f"{trip_count:,} trips",
         ).add_to(m)
@@ -224,25 +276,25 @@ def create_system_routes_map(
     # Calculate map center from all stations in top routes
     top_routes = routes_df.head(top_n)
 
-    # Collect all unique coordinates
-    all_lats = []
-    all_lngs = []
-
-    for row in top_routes.iter_rows(named=True):
-        if row.get("start_lat") and row.get("start_lng"):
-            all_lats.append(row["start_lat"])
-            all_lngs.append(row["start_lng"])
-        if row.get("end_lat") and row.get("end_lng"):
-            all_lats.append(row["end_lat"])
-            all_lngs.append(row["end_lng"])
-
-    # Calculate center
-    if all_lats and all_lngs:
-        center_lat = sum(all_lats) / len(all_lats)
-        center_lng = sum(all_lngs) / len(all_lngs)
-    else:
+    # Stack both route ends and average the valid coordinates in one pass
+    endpoints = pl.concat(
+        [
+            top_routes.select(
+                pl.col(f"{end}_lat").alias("lat"), pl.col(f"{end}_lng").alias("lng")
+            )
+            for end in ("start", "end")
+        ],
+        how="vertical_relaxed",
+    )
+    center_lat, center_lng = (
+        endpoints.filter(_has_coords("lat", "lng"))
+        .select(pl.col("lat").mean(), pl.col("lng").mean())
+        .row(0)
+    )
+
+    if center_lat is None or center_lng is None:
         # Default to DC center
-        center_lat, center_lng = 38.9072, -77.0369
+        center_lat, center_lng = DC_CENTER
 
     # Create base map
     m = folium.Map(
@@ -252,79 +304,81 @@ def create_system_routes_map(
     )
 
     # Get trip count range for color/weight scaling
-    trip_counts = top_routes["trip_count"].to_list()
-    min_trips = min(trip_counts) if trip_counts else 0
-    max_trips = max(trip_counts) if trip_counts else 1
-
-    # Create colormap from blue (low) to red (high)
-    import matplotlib.colors as mcolors
-    cmap = mcolors.LinearSegmentedColormap.from_list(
-        "route_popularity", ["#3498db", "#f39c12", "#e74c3c"]
-    )
+    min_trips = top_routes["trip_count"].min()
+    max_trips = top_routes["trip_count"].max()
+    if min_trips is None:
+        min_trips, max_trips = 0, 1
+
+    # Keep each route's rank, then drop routes without coordinates
+    coords = ["start_lat", "start_lng", "end_lat", "end_lng"]
+    drawable = top_routes.with_row_index("rank", offset=1).filter(_has_coords(*coords))
+
+    # Normalized popularity (0-1) for every route, mapped to colors in one lookup
+    counts = drawable["trip_count"].cast(pl.Float64).fill_null(0).to_numpy()
+    if max_trips > min_trips:
+        norm = (counts - min_trips) / (max_trips - min_trips)
+    else:
+        norm = np.full(len(counts), 0.5)
+    colors = _route_colors()[np.rint(np.clip(norm, 0.0, 1.0) * 255).astype(np.int32)]
 
-    # Track unique stations to avoid duplicate markers
-    station_markers = {}
+    # Scale line weight (thicker = more popular)
+    weights = _scale_values(counts, min_trips, max_trips, min_val=2, max_val=6)
 
     # Add lines for each route
-    for idx, row in enumerate(top_routes.iter_rows(named=True), start=1):
-        start_lat = row.get("start_lat")
-        start_lng = row.get("start_lng")
-        end_lat = row.get("end_lat")
-        end_lng = row.get("end_lng")
-        start_name = row.get("start_station_name", "Unknown")
-        end_name = row.get("end_station_name", "Unknown")
-        trip_count = row.get("trip_count", 0)
-
-        # Skip if missing coordinates
-        if not all([start_lat, start_lng, end_lat, end_lng]):
-            continue
-
-        # Calculate normalized color value (0-1)
-        if max_trips > min_trips:
-            norm_value = (trip_count - min_trips) / (max_trips - min_trips)
-        else:
-            norm_value = 0.5
-
-        # Get color from colormap
-        rgba = cmap(norm_value)
-        hex_color = mcolors.to_hex(rgba)
-
-        # Scale line weight (thicker = more popular)
-        weight = _scale_value(trip_count, min_trips, max_trips, min_val=2, max_val=6)
+    route_rows = drawable.select(
+        "rank",
+        *coords,
+        pl.col("start_station_name").fill_null("Unknown"),
+        pl.col("end_station_name").fill_null("Unknown"),
+        "trip_count",
+    ).rows()
+    for i, row in enumerate(route_rows):
+        idx, start_lat, start_lng, end_lat, end_lng, start_name, end_name, trip_count = row
 
         # Draw polyline
         folium.PolyLine(
             locations=[[start_lat, start_lng], [end_lat, end_lng]],
-            color=hex_color,
-            weight=weight,
+            color=colors[i],
+            weight=float(weights[i]),
             opacity=0.7,
             popup=f"<b>#{idx}: {start_name} → {end_name}</b><br>{trip_count:,} trips",
             tooltip=f"#{idx}: {trip_count:,} trips",
         ).add_to(m)
 
-        # Add station markers (only once per station)
-        for station_name, lat, lng in [
-            (start_name, start_lat, start_lng),
-            (end_name, end_lat, end_lng)
-        ]:
-            station_key = (lat, lng)
-            if station_key not in station_markers:
-                folium.CircleMarker(
-                    location=[lat, lng],
-                    radius=5,
-                    popup=f"<b>{station_name}</b>",
-                    tooltip=station_name,
-                    color="#2c3e50",
-                    fill=True,
-                    fillColor="#ecf0f1",
-                    fillOpacity=0.8,
-                    weight=2,
-                ).add_to(m)
-                station_markers[station_key] = station_name
+    # One marker per distinct station among the drawable routes
+    stations = pl.concat(
+        [
+            drawable.select(
+                pl.col(f"{end}_station_name").fill_null("Unknown").alias("name"),
+                pl.col(f"{end}_lat").alias("lat"),
+                pl.col(f"{end}_lng").alias("lng"),
+            )
+            for end in ("start", "end")
+        ],
+        how="vertical_relaxed",
+    ).unique(subset=["lat", "lng"], keep="first", maintain_order=True)
+
+    for station_name, lat, lng in stations.rows():
+        folium.CircleMarker(
+            location=[lat, lng],
+            radius=5,
+            popup=f"<b>{station_name}</b>",
+            tooltip=station_name,
+            color="#2c3e50",
+            fill=True,
+            fillColor="#ecf0f1",
+            fillOpacity=0.8,
+            weight=2,
+        ).add_to(m)
 
     return m
 
 
+def _has_coords(*cols: str) -> pl.Expr:
+    """Predicate: every given coordinate column is present and non-zero."""
+    return pl.all_horizontal([pl.col(c).is_not_null() & (pl.col(c) != 0) for c in cols])
+
+
 def _get_colormap(scheme: str, vmin: float, vmax: float) -> cm.LinearColormap:
     """
     Create a Branca colormap for the given scheme and value range.
@@ -337,64 +391,73 @@ def _get_colormap(scheme: str, vmin: float, vmax: float) -> cm.LinearColormap:
     Returns:
         LinearColormap object
     """
-    # Map scheme names to Branca colormaps
-    scheme_map = {
-        "YlOrRd": cm.linear.YlOrRd_09,
-        "Blues": cm.linear.Blues_09,
-        "Viridis": cm.linear.viridis,
-        "Greens": cm.linear.Greens_09,
-        "Reds": cm.linear.Reds_09,
-    }
-
-    colormap = scheme_map.get(scheme, cm.linear.YlOrRd_09)
+    # A fresh scaled copy each call: the colormap is attached to the map as
+    # its legend, so one instance can't be shared between maps
+    colormap = _SCHEMES.get(scheme, cm.linear.YlOrRd_09)
     colormap = colormap.scale(vmin, vmax)
 
     return colormap
 
 
-def _scale_radius(value: float, vmin: float, vmax: float, min_r: float = 5, max_r: float = 20) -> float:
+@lru_cache(maxsize=None)
+def _route_colors() -> np.ndarray:
     """
-    Scale a value to a radius within the given range.
+    256-step blue (low) to red (high) hex color table for route popularity.
 
-    Args:
-        value: Value to scale
-        vmin: Minimum value in dataset
-        vmax: Maximum value in dataset
-        min_r: Minimum radius
-        max_r: Maximum radius
-
-    Returns:
-        Scaled radius
+    Built once; Matplotlib is only imported when a routes map is drawn.
     """
-    if vmax == vmin:
-        return (min_r + max_r) / 2
+    import matplotlib.colors as mcolors
 
-    # Linear scaling
-    normalized = (value - vmin) / (vmax - vmin)
-    return min_r + (normalized * (max_r - min_r))
+    cmap = mcolors.LinearSegmentedColormap.from_list(
+        "route_popularity", ["#3498db", "#f39c12", "#e74c3c"]
+    )
+    return np.array([mcolors.to_hex(cmap(i / 255)) for i in range(256)])
 
 
-def _scale_value(value: float, vmin: float, vmax: float, min_val: float, max_val: float) -> float:
+def _scale_values(
+    values: np.ndarray, vmin: float, vmax: float, min_val: float, max_val: float
+) -> np.ndarray:
     """
-    Generic linear scaling function.
+    Linearly scale an array of values into [min_val, max_val].
 
     Args:
-        value: Value to scale
+        values: Values to scale
         vmin: Minimum value in dataset
         vmax: Maximum value in dataset
         min_val: Minimum output value
         max_val: Maximum output value
 
     Returns:
-        Scaled value
+        Scaled values
     """
     if vmax == vmin:
-        return (min_val + max_val) / 2
+        return np.full(len(values), (min_val + max_val) / 2)
 
-    normalized = (value - vmin) / (vmax - vmin)
+    normalized = (values - vmin) / (vmax - vmin)
     return min_val + (normalized * (max_val - min_val))
 
 
+def _format_numbers(series: pl.Series, spec: str) -> pl.Series:
+    """
+    Format a numeric Series as strings with a Python format spec.
+
+    Polars has no thousands-separator formatting, so the values are
+    formatted here in one pass; nulls stay null.
+
+    Args:
+        series: Numeric Series
+        spec: Format spec, e.g. ",.0f"
+
+    Returns:
+        Utf8 Series of formatted values
+    """
+    return pl.Series(
+        series.name,
+        [None if v is None else format(v, spec) for v in series.to_list()],
+        dtype=pl.Utf8,
+    )
+
+
 def _format_metric(metric_col: str) -> str:
     """
     Convert metric column name to display-friendly label.
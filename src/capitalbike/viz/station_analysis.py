@@ -27,6 +27,9 @@ def create_hourly_heatmap(hourly_df: pl.DataFrame, station_name: str, metric_nam
     Returns:
         Plotly Figure object
     """
+    if hourly_df.is_empty():
+        return _empty_figure(f"{station_name}: Hourly {metric_name} Pattern")
+
     # Map metric name to column
     metric_col_map = {
         "Checkouts": "num_checkouts",
@@ -45,25 +48,24 @@ def create_hourly_heatmap(hourly_df: pl.DataFrame, station_name: str, metric_nam
         (pl.col("date").dt.weekday() - 1).alias("weekday")
     )
 
-    # Aggregate by weekday and hour
-    pivot_data = (
-        df.group_by(["weekday", "hour"])
+    # Aggregate by weekday and hour, then pivot: rows=hours, columns=weekdays
+    pivot = (
+        df.group_by(["hour", "weekday"])
         .agg(pl.mean(metric_col).alias("avg_value"))
-        .sort(["weekday", "hour"])
+        .pivot(values="avg_value", index="hour", columns="weekday", aggregate_function="first")
+        .with_columns(pl.col("hour").cast(pl.Int64))
     )
 
-    # Create pivot table: rows=hours, columns=weekdays
-    # Initialize matrix with zeros
-    matrix = np.zeros((24, 7))
-
-    for row in pivot_data.iter_rows(named=True):
-        weekday = row["weekday"]
-        hour = row["hour"]
-        avg_value = row["avg_value"]
-
-        # Ensure indices are within bounds
-        if 0 <= weekday < 7 and 0 <= hour < 24:
-            matrix[hour, weekday] = avg_value if avg_value is not None else 0
+    # Reindex onto the full 24 x 7 grid; missing cells are zero
+    full = pl.DataFrame({"hour": list(range(24))}).join(pivot, on="hour", how="left")
+    matrix = full.select(
+        [
+            pl.col(str(w)).cast(pl.Float64).fill_null(0)
+            if str(w) in full.columns
+            else pl.lit(0.0).alias(str(w))
+            for w in range(7)
+        ]
+    ).to_numpy()
 
     # Choose color scale based on metric
     if metric_name == "Net Flow":
@@ -116,25 +118,30 @@ def create_flow_chart(daily_df: pl.DataFrame, station_name: str) -> go.Figure:
     Returns:
         Plotly Figure object
     """
-    # Calculate net flow
-    df = daily_df.with_columns(
-        (pl.col("num_checkouts") - pl.col("num_returns")).alias("net_flow")
+    if daily_df.is_empty():
+        return _empty_figure(f"{station_name}: Capacity Pressure Analysis")
+
+    # Calculate net flow and its magnitude in one expression batch
+    net_flow = pl.col("num_checkouts") - pl.col("num_returns")
+    df = daily_df.select(
+        pl.col("date"),
+        net_flow.alias("net_flow"),
+        net_flow.abs().alias("net_flow_abs"),
     )
 
     # Calculate capacity pressure threshold (90th percentile)
-    net_flow_abs = df["net_flow"].abs()
-    threshold = net_flow_abs.quantile(0.9)
+    threshold = df["net_flow_abs"].quantile(0.9)
 
     # Identify high-pressure days
-    high_pressure = df.filter(net_flow_abs > threshold)
+    high_pressure = df.filter(pl.col("net_flow_abs") > threshold)
 
     fig = go.Figure()
 
     # Add main net flow line
     fig.add_trace(
         go.Scatter(
-            x=df["date"],
-            y=df["net_flow"],
+            x=df["date"].to_numpy(),
+            y=df["net_flow"].to_numpy(),
             name="Net Flow",
             mode="lines",
             line=dict(color="#17becf", width=1.5),
@@ -173,8 +180,8 @@ def create_flow_chart(daily_df: pl.DataFrame, station_name: str) -> go.Figure:
     if len(high_pressure) > 0:
         fig.add_trace(
             go.Scatter(
-                x=high_pressure["date"],
-                y=high_pressure["net_flow"],
+                x=high_pressure["date"].to_numpy(),
+                y=high_pressure["net_flow"].to_numpy(),
                 name="High Pressure Days",
                 mode="markers",
                 marker=dict(color="red", size=8, symbol="diamond"),
@@ -210,7 +217,8 @@ def create_top_routes_bar(routes_df: pl.DataFrame, chart_title: str, top_n: int
     Create a horizontal bar chart showing top destination or origin stations.
 
     Args:
-        routes_df: DataFrame with columns: end_station_name, trip_count
+        routes_df: DataFrame with columns: end_station_name (outbound) or
+            start_station_name (inbound), trip_count
         chart_title: Title for the chart
         top_n: Number of top routes to show
         is_outbound: True for destinations (outbound), False for origins (inbound)
@@ -218,18 +226,25 @@ def create_top_routes_bar(routes_df: pl.DataFrame, chart_title: str, top_n: int
     Returns:
         Plotly Figure object
     """
+    if routes_df.is_empty():
+        return _empty_figure(chart_title)
+
+    other_station_col = "end_station_name" if is_outbound else "start_station_name"
+
     # Take top N and reverse for horizontal bar (so #1 is at top)
     top_routes = routes_df.head(top_n).reverse()
 
+    trip_counts = top_routes["trip_count"].to_numpy()
+
     fig = go.Figure()
 
     fig.add_trace(
         go.Bar(
-            x=top_routes["trip_count"],
-            y=top_routes["end_station_name"],
+            x=trip_counts,
+            y=top_routes[other_station_col].to_list(),
             orientation="h",
             marker=dict(
-                color=top_routes["trip_count"],
+                color=trip_counts,
                 colorscale="Blues",
                 showscale=False,
             ),
@@ -260,13 +275,28 @@ def create_station_overview_metrics(
     Returns:
         Dictionary with keys: total_trips, avg_duration_min, active_days, avg_daily_trips
     """
-    total_checkouts = daily_df["num_checkouts"].sum()
-    total_returns = daily_df["num_returns"].sum() if "num_returns" in daily_df.columns else total_checkouts
-    total_trips = (total_checkouts + total_returns) // 2  # Average to avoid double-counting
+    if daily_df.is_empty():
+        return {
+            "total_trips": 0,
+            "avg_duration_min": 0.0,
+            "active_days": 0,
+            "avg_daily_trips": 0.0,
+        }
+
+    cols = daily_df.columns
+    returns_col = "num_returns" if "num_returns" in cols else "num_checkouts"
+
+    # All four aggregates in one select
+    total_checkouts, total_returns, avg_duration_sec, active_days = daily_df.select(
+        pl.col("num_checkouts").sum(),
+        pl.col(returns_col).sum().alias("total_returns"),
+        pl.col("avg_duration_sec").mean() if "avg_duration_sec" in cols else pl.lit(0.0),
+        pl.len(),
+    ).row(0)
 
-    avg_duration_min = daily_df["avg_duration_sec"].mean() / 60 if "avg_duration_sec" in daily_df.columns else 0
+    total_trips = (total_checkouts + total_returns) // 2  # Average to avoid double-counting
 
-    active_days = len(daily_df)
+    avg_duration_min = (avg_duration_sec or 0) / 60
 
     avg_daily_trips = total_trips / active_days if active_days > 0 else 0
 
@@ -276,3 +306,33 @@ def create_station_overview_metrics(
         "active_days": active_days,
         "avg_daily_trips": float(avg_daily_trips),
     }
+
+
+def _empty_figure(title: str) -> go.Figure:
+    """
+    Placeholder figure for a station with no rows in the selected data.
+
+    Args:
+        title: Chart title
+
+    Returns:
+        Plotly Figure object with a centered "No data available" note
+    """
+    fig = go.Figure()
+    fig.update_layout(
+        title=title,
+        xaxis=dict(visible=False),
+        yaxis=dict(visible=False),
+        annotations=[
+            dict(
+                text="No data available",
+                xref="paper",
+                yref="paper",
+                x=0.5,
+                y=0.5,
+                showarrow=False,
+                font=dict(size=14, color="gray"),
+            )
+        ],
+    )
+    return fig
@@ -10,12 +10,48 @@ from plotly.subplots import make_subplots
 import numpy as np
 from datetime import datetime, date
 
+# Daily series longer than this are downsampled before plotting
+MAX_POINTS = 1500
+
+# Series with more points than this (before downsampling) are drawn with
+# WebGL instead of SVG
+WEBGL_THRESHOLD = 2000
+
+# Date-range quick-select buttons for the system chart
+_RANGESELECTOR_BUTTONS = (
+    dict(count=1, label="1m", step="month", stepmode="backward"),
+    dict(count=6, label="6m", step="month", stepmode="backward"),
+    dict(count=1, label="YTD", step="year", stepmode="todate"),
+    dict(count=1, label="1y", step="year", stepmode="backward"),
+    dict(step="all", label="All"),
+)
+
+# Static layout shared by every chart; only titles vary per call
+_SYSTEM_LAYOUT = dict(
+    hovermode="x unified",
+    height=500,
+    xaxis=dict(
+        title="Date",
+        rangeslider=dict(visible=True),
+        rangeselector=dict(buttons=_RANGESELECTOR_BUTTONS),
+    ),
+    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+)
+
+_STATION_LAYOUT = dict(
+    xaxis_title="Date",
+    hovermode="x",
+    height=300,
+    margin=dict(l=20, r=20, t=40, b=20),
+)
+
 
 def create_system_timeseries(
     df: pl.DataFrame,
     aggregation: str = "Daily",
     metric: str = "Trips",
     show_trend: bool = False,
+    max_points: int | None = MAX_POINTS,
 ) -> go.Figure:
     """
     Create an interactive time-series chart for system-level metrics.
@@ -25,6 +61,7 @@ def create_system_timeseries(
         aggregation: "Daily", "Weekly", or "Monthly"
         metric: "Trips", "Avg Duration", or "Both"
         show_trend: Whether to overlay a linear trend line
+        max_points: Downsample longer series to this many points (None to disable)
 
     Returns:
         Plotly Figure object
@@ -32,79 +69,89 @@ def create_system_timeseries(
     # Resample data based on aggregation level
     df_agg = _resample_data(df, aggregation)
 
-    # Create figure (dual-axis if "Both" selected)
-    if metric == "Both":
-        fig = make_subplots(specs=[[{"secondary_y": True}]])
-    else:
-        fig = go.Figure()
+    # Fit the trend on the full series before any downsampling; a straight
+    # line only needs its two end points
+    trend_x = trend_y = None
+    if show_trend and metric in ["Trips", "Both"]:
+        slope, intercept = _calculate_trend(df_agg["date"], df_agg["trips"])
+        trend_x = [df_agg["date"].min(), df_agg["date"].max()]
+        span_days = (trend_x[1] - trend_x[0]).days
+        trend_y = [intercept, intercept + slope * span_days]
+
+    use_webgl = df_agg.height > WEBGL_THRESHOLD
+
+    if max_points is not None and df_agg.height > max_points:
+        shape_col = "avg_duration_sec" if metric == "Avg Duration" else "trips"
+        keep = _lttb_indices(
+            _days_since_start(df_agg["date"]),
+            df_agg[shape_col].cast(pl.Float64).to_numpy(),
+            max_points,
+        )
+        df_agg = df_agg[keep]
+
+    Scatter = go.Scattergl if use_webgl else go.Scatter
+
+    # Hand Plotly NumPy arrays, converted once and shared across traces
+    x = df_agg["date"].to_numpy()
+
+    # Collect traces (and their axis side) based on metric selection
+    traces = []
+    secondary = []
 
-    # Add traces based on metric selection
     if metric in ["Trips", "Both"]:
-        fig.add_trace(
-            go.Scatter(
-                x=df_agg["date"],
-                y=df_agg["trips"],
+        traces.append(
+            Scatter(
+                x=x,
+                y=df_agg["trips"].to_numpy(),
                 name="Trips",
                 mode="lines",
                 line=dict(color="#1f77b4", width=2),
                 hovertemplate="<b>%{x|%Y-%m-%d}</b><br>Trips: %{y:,}<extra></extra>",
-            ),
-            secondary_y=False if metric == "Both" else None,
+            )
         )
+        secondary.append(False)
 
-        if show_trend:
-            trend_line = _calculate_trend(df_agg["date"], df_agg["trips"])
-            fig.add_trace(
-                go.Scatter(
-                    x=df_agg["date"],
-                    y=trend_line,
+        if trend_x is not None:
+            traces.append(
+                Scatter(
+                    x=trend_x,
+                    y=trend_y,
                     name="Trend",
                     mode="lines",
                     line=dict(color="#1f77b4", width=2, dash="dash"),
                     hovertemplate="Trend: %{y:,.0f}<extra></extra>",
-                ),
-                secondary_y=False if metric == "Both" else None,
+                )
             )
+            secondary.append(False)
 
     if metric in ["Avg Duration", "Both"]:
-        # Convert seconds to minutes for readability
-        duration_min = df_agg["avg_duration_sec"] / 60
-
-        fig.add_trace(
-            go.Scatter(
-                x=df_agg["date"],
-                y=duration_min,
+        traces.append(
+            Scatter(
+                x=x,
+                y=df_agg["avg_duration_min"].to_numpy(),
                 name="Avg Duration",
                 mode="lines",
                 line=dict(color="#ff7f0e", width=2),
                 hovertemplate="<b>%{x|%Y-%m-%d}</b><br>Duration: %{y:.1f} min<extra></extra>",
-            ),
-            secondary_y=True if metric == "Both" else None,
+            )
         )
+        secondary.append(True)
+
+    # Create figure (dual-axis if "Both" selected) and add all traces at once
+    if metric == "Both":
+        fig = make_subplots(specs=[[{"secondary_y": True}]])
+        fig.add_traces(traces, secondary_ys=secondary)
+    else:
+        fig = go.Figure()
+        fig.add_traces(traces)
 
     # Update layout
     title = f"Capital Bikeshare {aggregation} Trends"
-    fig.update_layout(
-        title=title,
-        hovermode="x unified",
-        height=500,
-        xaxis=dict(
-            title="Date",
-            rangeslider=dict(visible=True),
-            rangeselector=dict(
-                buttons=list(
-                    [
-                        dict(count=1, label="1m", step="month", stepmode="backward"),
-                        dict(count=6, label="6m", step="month", stepmode="backward"),
-                        dict(count=1, label="YTD", step="year", stepmode="todate"),
-                        dict(count=1, label="1y", step="year", stepmode="backward"),
-                        dict(step="all", label="All"),
-                    ]
-                )
-            ),
-        ),
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-    )
+    fig.update_layout(title=title, **_SYSTEM_LAYOUT)
+    if use_webgl:
+        # The range slider preview cannot draw WebGL traces; the range
+        # selector buttons still zoom the x-axis
+        fig.update_layout(xaxis_rangeslider_visible=False)
 
     # Update axis labels
     if metric == "Both":
@@ -127,71 +174,166 @@ def _resample_data(df: pl.DataFrame, aggregation: str) -> pl.DataFrame:
         aggregation: "Daily", "Weekly", or "Monthly"
 
     Returns:
-        Resampled DataFrame
+        Resampled DataFrame, with avg_duration_min added
     """
+    # Durations are plotted in minutes (seconds are kept for downsampling)
+    to_minutes = (pl.col("avg_duration_sec") / 60).alias("avg_duration_min")
+
     if aggregation == "Daily":
-        return df
+        return df.with_columns(to_minutes)
 
-    # Convert aggregation to Polars interval string
+    # Already at (or coarser than) the requested granularity: nothing to do
+    target_days = {"Weekly": 7, "Monthly": 28}.get(aggregation, 1)
+    gaps = df["date"].diff().dt.total_days().drop_nulls()
+    if gaps.len() == 0 or gaps.min() >= target_days:
+        return df.with_columns(to_minutes)
+
+    # Convert aggregation to Polars truncation interval
     interval_map = {
         "Weekly": "1w",
         "Monthly": "1mo",
     }
     interval = interval_map.get(aggregation, "1d")
 
-    # Resample using group_by_dynamic
+    # Fixed calendar buckets: truncate each date to its week/month start and
+    # hash-group on it, no dynamic window engine needed
     resampled = (
-        df.sort("date")
-        .group_by_dynamic("date", every=interval)
+        df.lazy()
+        .select(
+            pl.col("date").dt.truncate(interval),
+            pl.col("trips"),
+            pl.col("avg_duration_sec"),
+        )
+        .group_by("date")
         .agg(
             [
                 pl.sum("trips").alias("trips"),
                 pl.mean("avg_duration_sec").alias("avg_duration_sec"),
+                (pl.mean("avg_duration_sec") / 60).alias("avg_duration_min"),
             ]
         )
+        .sort("date")
+        .collect()
     )
 
     return resampled
 
 
-def _calculate_trend(dates: pl.Series, values: pl.Series) -> np.ndarray:
+def _calculate_trend(dates: pl.Series, values: pl.Series) -> tuple[float, float]:
     """
-    Calculate linear trend line using least squares regression.
+    Calculate a linear trend using least squares regression.
 
     Args:
         dates: Series of dates
         values: Series of numeric values
 
     Returns:
-        Array of trend values
+        (slope, intercept), with x measured in days since the first date
     """
     # Convert dates to numeric values (days since first date)
-    date_list = dates.to_list()
-    first_date = min(date_list)
+    x = _days_since_start(dates)
+    y = values.cast(pl.Float64).to_numpy()
 
-    x = np.array([(d - first_date).days for d in date_list])
-    y = values.to_numpy()
+    # Dense series (the usual case): fit directly, no mask needed
+    has_gaps = values.null_count() > 0 or (
+        values.dtype.is_float() and values.is_nan().any()
+    )
+    if not has_gaps:
+        return _linear_fit(x, y)
 
     # Remove any NaNs
     mask = ~np.isnan(y)
-    x = x[mask]
-    y = y[mask]
+    return _linear_fit(x[mask], y[mask])
 
-    # Fit linear trend
-    coeffs = np.polyfit(x, y, 1)
-    trend = np.polyval(coeffs, x)
 
-    # Create full-length array with NaNs where original data had NaNs
-    full_trend = np.full(len(dates), np.nan)
-    full_trend[mask] = trend
+def _linear_fit(x: np.ndarray, y: np.ndarray) -> tuple[float, float]:
+    """
+    Degree-1 least-squares fit (closed form).
 
-    return full_trend
+    Args:
+        x: x values
+        y: y values, without NaNs
+
+    Returns:
+        (slope, intercept)
+    """
+    xm = x.mean()
+    ym = y.mean()
+    dx = x - xm
+    ss_x = (dx * dx).sum()
+    if ss_x == 0:
+        return 0.0, float(ym)
+
+    slope = float((dx * (y - ym)).sum() / ss_x)
+    return slope, float(ym - slope * xm)
+
+
+def _days_since_start(dates: pl.Series) -> np.ndarray:
+    """
+    Convert a date Series to float day offsets from its earliest date.
+
+    Args:
+        dates: Series of dates
+
+    Returns:
+        Array of day offsets
+    """
+    d = dates.to_numpy().astype("datetime64[D]")
+    return (d - d.min()).view("i8").astype(np.float64)
+
+
+def _lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Pick n_out points that preserve a series' visual shape (Largest-Triangle-Three-Buckets).
+
+    The first and last points are always kept. The points between them are
+    split into n_out - 2 buckets, and each bucket keeps the point forming the
+    largest triangle with the previously kept point and the next bucket's mean.
+
+    Args:
+        x: Sorted x values
+        y: y values (NaNs are treated as 0 when choosing points)
+        n_out: Number of points to keep
+
+    Returns:
+        Sorted array of row indices to keep
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    y = np.nan_to_num(y)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (
+            (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        )
+
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(area.argmax())
+        keep[i + 1] = a
+
+    return keep
 
 
 def create_station_timeseries(
     df: pl.DataFrame,
     station_name: str,
     metric: str = "num_checkouts",
+    max_points: int | None = MAX_POINTS,
 ) -> go.Figure:
     """
     Create a time-series chart for a specific station.
@@ -200,25 +342,39 @@ def create_station_timeseries(
         df: DataFrame with columns: date, num_checkouts, avg_duration_sec
         station_name: Name of the station for the title
         metric: Column name to plot (num_checkouts, avg_duration_sec, net_flow)
+        max_points: Downsample longer series to this many points (None to disable)
 
     Returns:
         Plotly Figure object
     """
+    use_webgl = df.height > WEBGL_THRESHOLD
+
+    if max_points is not None and df.height > max_points:
+        df = df.sort("date")
+        keep = _lttb_indices(
+            _days_since_start(df["date"]),
+            df[metric].cast(pl.Float64).to_numpy(),
+            max_points,
+        )
+        df = df[keep]
+
     metric_labels = {
         "num_checkouts": "Number of Checkouts",
         "avg_duration_sec": "Avg Duration (minutes)",
         "net_flow": "Net Flow (checkouts - returns)",
     }
 
-    y_data = df[metric]
+    y_data = df[metric].to_numpy()
     if metric == "avg_duration_sec":
         y_data = y_data / 60  # Convert to minutes
 
+    Scatter = go.Scattergl if use_webgl else go.Scatter
+
     fig = go.Figure()
 
     fig.add_trace(
-        go.Scatter(
-            x=df["date"],
+        Scatter(
+            x=df["date"].to_numpy(),
             y=y_data,
             mode="lines",
             line=dict(color="#2ca02c", width=1.5),
@@ -230,11 +386,8 @@ def create_station_timeseries(
 
     fig.update_layout(
         title=f"{station_name}: {metric_labels.get(metric, metric)}",
-        xaxis_title="Date",
         yaxis_title=metric_labels.get(metric, metric),
-        hovermode="x",
-        height=300,
-        margin=dict(l=20, r=20, t=40, b=20),
+        **_STATION_LAYOUT,
     )
 
     return fig
@@ -0,0 +1,116 @@
+from datetime import datetime
+
+import polars as pl
+import pytest
+
+from capitalbike.data import summarize
+
+
+@pytest.fixture
+def master(tmp_path, monkeypatch):
+    """Point the summary builders at a small hive-partitioned master table."""
+    trips = pl.DataFrame(
+        {
+            "started_at": [
+                datetime(2024, 1, 1, 8),
+                datetime(2024, 1, 1, 9),
+                datetime(2024, 1, 2, 17),
+                datetime(2024, 2, 1, 8),
+            ],
+            "ended_at": [
+                datetime(2024, 1, 1, 8, 20),
+                datetime(2024, 1, 1, 9, 10),
+                datetime(2024, 1, 2, 17, 30),
+                datetime(2024, 2, 1, 8, 15),
+            ],
+            "duration_sec": [1200, 600, 1800, 900],
+            "start_station_id": [1, 1, 2, 1],
+            "end_station_id": [2, 2, 1, 2],
+            "bike_number": ["a", "b", "a", "c"],
+            "member_type": ["Member", "casual", None, "member"],
+            "rideable_type": ["classic_bike", None, "classic_bike", "electric_bike"],
+        }
+    )
+    for month in (1, 2):
+        path = tmp_path / "year=2024" / f"month={month}"
+        path.mkdir(parents=True)
+        trips.filter(pl.col("started_at").dt.month() == month).write_parquet(
+            path / "part.parquet"
+        )
+
+    scan_parquet = pl.scan_parquet
+
+    def scan_local(source, **kwargs):
+        kwargs.pop("storage_options", None)
+        return scan_parquet(str(tmp_path / "year=*/month=*/part.parquet"), **kwargs)
+
+    stations = pl.DataFrame(
+        {
+            "station_id": [1, 2],
+            "station_name": ["A St", "B St"],
+            "lat": [38.9, 38.8],
+            "lng": [-77.0, -77.1],
+        }
+    )
+    written = {}
+
+    monkeypatch.setattr(summarize.pl, "scan_parquet", scan_local)
+    monkeypatch.setattr(summarize, "_stations_df", lambda: stations)
+    monkeypatch.setattr(
+        summarize,
+        "_write_parquet_to_s3",
+        lambda df, uri: written.__setitem__(uri.rsplit("/", 1)[-1], df),
+    )
+    return written
+
+
+def test_trips_scan_keeps_date_after_projection(master):
+    trips = summarize._trips_scan(["date", "duration_sec"]).collect(streaming=True)
+
+    assert trips.columns == ["date", "duration_sec"]
+    assert trips["date"].dtype == pl.Date
+
+
+def test_trips_collect_derives_date(master):
+    trips = summarize._trips_collect()
+
+    assert trips.columns == summarize._TRIP_COLUMNS
+    assert trips.height == 4
+    assert trips["date"].n_unique() == 3
+
+
+@pytest.mark.parametrize("preload", [False, True])
+def test_station_daily(master, preload):
+    trips = summarize._trips_collect().lazy() if preload else None
+    out = summarize._station_daily_frame(trips)
+
+    row = out.filter(
+        (pl.col("station_id") == 1) & (pl.col("date") == datetime(2024, 1, 1).date())
+    )
+    assert row["num_checkouts"].to_list() == [2]
+    assert row["distinct_bikes_out"].to_list() == [2]
+    assert out["num_checkouts"].sum() == 4
+    assert out["num_returns"].sum() == 4
+
+
+@pytest.mark.parametrize("preload", [False, True])
+def test_station_hourly(master, preload):
+    trips = summarize._trips_collect().lazy() if preload else None
+    summarize.build_station_hourly(trips)
+
+    out = master["station_hourly.parquet"]
+    assert "date" in out.columns
+    assert out["num_checkouts"].sum() == 4
+    assert out["num_returns"].sum() == 4
+
+
+@pytest.mark.parametrize("preload", [False, True])
+def test_station_daily_detailed(master, preload):
+    trips = summarize._trips_collect().lazy() if preload else None
+    summarize.build_station_daily_detailed(trips)
+
+    out = master["station_daily_detailed.parquet"]
+    assert "date" in out.columns
+    assert set(out["member_type"]) == {"member", "casual", "unknown"}
+    assert set(out["rideable_type"]) == {"classic_bike", "electric_bike", "unknown"}
+    assert out["num_checkouts"].sum() == 4